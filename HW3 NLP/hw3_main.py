@@ -6,7 +6,6 @@ February 25, 2023
 
 from nlp_visualizer import TextProcessor
 import random as rand
-import nlp_parsers as par
 from exception import OutOfRangeError
 
 
@@ -40,9 +39,8 @@ def main():
         idx1 = idx0 + num
         print(f'\nLoading {num} Ted Talks...')
 
-        # load the texts
-        for i in range(idx0, idx1):
-            tp.load_text(file, parser=par.csv_parser, index=i, p_type='csv', url_header='https://www.ted.com/talks/')
+        # load the texts (one pass over the csv)
+        tp.load_corpus(file, start=idx0, stop=idx1, url_header='https://www.ted.com/talks/')
 
         print('\n---------\nComplete!\n---------\n')
 
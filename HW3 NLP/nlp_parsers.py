@@ -5,9 +5,7 @@ compatible with nlp_visualizer TextProcessor objects
 
 import json
 import pandas as pd
-import string
 from collections import Counter
-from nltk.corpus import stopwords
 from nlp_visualizer import TextProcessor
 from utils import title_from_url
 
@@ -24,18 +22,12 @@ def json_parser(filename):
 
 
 def csv_parser(filename, idx, url_header=None):
-    text = pd.read_csv(filename).iloc[idx, 0]
-    words = text.translate(str.maketrans(string.punctuation, ' '*len(string.punctuation))).lower().split(' ')
-    stop_words = TextProcessor.load_stop_words(stopwords.words('english'), words)
-    words = [w for w in words if w not in stop_words]
-    words = [w for w in words if w != '' and w != '—']
-
-    results = {'word_count': dict(Counter(words)),
-               'num_words': len(words),
-               'word_length': dict(zip([w for w in words], [len(w) for w in words]))}
+    # read only row idx (to load many rows, use TextProcessor.load_corpus)
+    row = pd.read_csv(filename, skiprows=range(1, idx + 1), nrows=1).iloc[0]
+    results = TextProcessor._parse_text(row.iloc[0])
 
     if url_header is not None:
-        url = pd.read_csv(filename).iloc[idx, 1]
+        url = row.iloc[1]
         label = title_from_url(url, url_header)
 
     else:
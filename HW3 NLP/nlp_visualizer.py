@@ -5,20 +5,36 @@ February 25, 2023
 """
 
 from collections import Counter, defaultdict
-from nltk.corpus import stopwords
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from plotly.subplots import make_subplots
-from utils import sort_limit_dict
+from utils import title_from_url
+from scipy import sparse
 from exception import OutOfRangeError
 import plotly.graph_objects as go
 import plotly.express as px
+import numpy as np
 import pandas as pd
 import sankey as sk
 import itertools
 import string
-import nltk
 
-# download needed for first run
-nltk.download('stopwords')
+# nltk's english stop words, used when the nltk corpus is not installed (no download needed)
+ENGLISH_STOP_WORDS = (
+    "i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself yourselves "
+    "he him his himself she she's her hers herself it it's its itself they them their theirs themselves "
+    "what which who whom this that that'll these those am is are was were be been being have has had "
+    "having do does did doing a an the and but if or because as until while of at by for with about "
+    "against between into through during before after above below to from up down in out on off over "
+    "under again further then once here there when where why how all any both each few more most other "
+    "some such no nor not only own same so than too very s t can will just don don't should should've "
+    "now d ll m o re ve y ain aren aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn "
+    "hasn't haven haven't isn isn't ma mightn mightn't mustn mustn't needn needn't shan shan't shouldn "
+    "shouldn't wasn wasn't weren weren't won won't wouldn wouldn't").split()
+
+# common words in ted talk transcripts that say nothing about the talk
+TALK_STOP_WORDS = ['like', 'applause', 'laughter', 'us', 'one', 'going', 'really',
+                   'much', 'also', 'got', 'would', 'said']
 
 
 class TextProcessor:
@@ -26,7 +42,16 @@ class TextProcessor:
 
     def __init__(self):
         """ manage data about different texts that are registered in the framework """
-        self.data = defaultdict(dict)  # our data extracted from text files
+        self.data = defaultdict(dict)  # our data extracted from text files (words as vocabulary ids)
+        self.vocab = {}  # word --> integer id, shared by every document
+        self.words = []  # id --> word
+        self.lengths = []  # id --> length of the word
+        self._dtm = None  # document-term matrix, rebuilt after new documents are loaded
+        self.totals = np.zeros(0, dtype=np.int64)  # id --> count of the word across all documents
+        self.doc_freq = np.zeros(0, dtype=np.int64)  # id --> number of documents containing the word
+        self.num_docs = 0  # documents with word counts
+        self._ranked = None  # ids of the words in every document, most common first (until the next load)
+        self._top = {}  # k --> top_k(k) result (until the next load)
 
     @staticmethod
     def _default_parser(filename):
@@ -37,7 +62,7 @@ class TextProcessor:
             lines = f.readlines()
             lines = [text.replace("\n", '') for text in lines]
             words = str(lines).translate(str.maketrans('', '', string.punctuation)).lower().split(' ')
-            stop_words = TextProcessor.load_stop_words(stopwords.words('english'), words)
+            stop_words = TextProcessor.stop_words()
             words = [w for w in words if w not in stop_words]
             f.close()
 
@@ -47,15 +72,98 @@ class TextProcessor:
 
         return results
 
+    @staticmethod
+    def _parse_text(text):
+        """ splits one document's text into words (punctuation, capital letters and stop words removed);
+        generates the same results dictionary as the other parsers """
+        words = text.translate(str.maketrans(string.punctuation, ' '*len(string.punctuation))).lower().split(' ')
+        stop_words = TextProcessor.stop_words()
+        words = [w for w in words if w not in stop_words and w != '' and w != '—']
+
+        results = {'word_count': dict(Counter(words)),
+                   'num_words': len(words),
+                   'word_length': dict(zip([w for w in words], [len(w) for w in words]))}
+
+        return results
+
     def _save_results(self, label, results):
         """ Integrate parsing results into internal state
         label: unique label for a text file that we parsed
         results: the data extracted from the file as a dictionary attribute-->raw data
+        word counts are stored as vocabulary ids and counts (one row of the document-term matrix),
+        the other attributes as they are
         """
+        results = dict(results)
+        word_count = results.pop('word_count', None)
+        results.pop('word_length', None)  # the length of each word is kept once, in the vocabulary
+
+        if word_count is not None:
+            # intern each new word, then store the document's word ids and counts in the order the
+            # words first appear (so ties in count or length go to the earlier word, as before)
+            for word in word_count:
+                if word not in self.vocab:
+                    self.vocab[word] = len(self.words)
+                    self.words.append(word)
+                    self.lengths.append(len(word))
+
+            ids = np.fromiter((self.vocab[w] for w in word_count), dtype=np.int32, count=len(word_count))
+            counts = np.fromiter(word_count.values(), dtype=np.int32, count=len(word_count))
+            results['word_ids'] = ids
+            results['counts'] = counts
+
+        # update the corpus-wide aggregates (replacing a document already loaded under this label)
+        if label in self.data:
+            self._count(self.data[label], -1)
+        self._count(results, 1)
+
         self.data[label] = results
+        self._dtm = None
+        self._ranked = None
+        self._top = {}
+
+    def _count(self, results, sign):
+        """ add (sign=1) or remove (sign=-1) a document's words from the corpus totals """
+        if 'word_ids' not in results:
+            return
+
+        # grow the aggregates (doubling) to cover every vocabulary id
+        if len(self.totals) < len(self.words):
+            size = max(len(self.words), 2 * len(self.totals))
+            self.totals = np.concatenate([self.totals, np.zeros(size - len(self.totals), dtype=np.int64)])
+            self.doc_freq = np.concatenate([self.doc_freq, np.zeros(size - len(self.doc_freq), dtype=np.int64)])
+
+        self.totals[results['word_ids']] += sign * results['counts']
+        self.doc_freq[results['word_ids']] += sign
+        self.num_docs += sign
+
+    def doc_term(self):
+        """ sparse (CSR) document-term matrix of word counts:
+        one row per document (in the order of self.data), one column per vocabulary word """
+        if self._dtm is None:
+            docs = [results for results in self.data.values() if 'word_ids' in results]
+            indptr = np.concatenate([[0], np.cumsum([len(r['word_ids']) for r in docs])])
+            ids = np.concatenate([r['word_ids'] for r in docs]) if docs else np.zeros(0, dtype=np.int32)
+            counts = np.concatenate([r['counts'] for r in docs]) if docs else np.zeros(0, dtype=np.int32)
+            self._dtm = sparse.csr_matrix((counts, ids, indptr), shape=(len(docs), len(self.words)))
+            self._dtm.sort_indices()  # each row's ids are in first-seen order
+
+        return self._dtm
+
+    def word_count(self, label):
+        """ word --> count dictionary of one document """
+        # look the label up without the defaultdict adding an empty document for a missing one
+        if label not in self.data:
+            raise KeyError(label)
+
+        results = self.data[label]
+        if 'word_ids' not in results:
+            return {}
+        return {self.words[i]: int(c) for i, c in zip(results['word_ids'], results['counts'])}
 
-    def load_text(self, filename, index=None, label=None, parser=None, p_type=None, url_header=None):
-        """ Register a document with the framework """
+    @staticmethod
+    def _parse(filename, index=None, label=None, parser=None, p_type=None, url_header=None):
+        """ runs the right parser on a document (see load_text)
+        returns the results dictionary and the document's label """
         if parser is None:  # do default parsing of standard .txt file
             results = TextProcessor._default_parser(filename)
 
@@ -68,42 +176,118 @@ class TextProcessor:
         if label is None:
             label = filename
 
+        return results, label
+
+    @staticmethod
+    def _chunksize(n, workers):
+        """ number of documents handed to a worker at a time (about 4 chunks per worker) """
+        return max(1, n // (4 * workers))
+
+    def load_text(self, filename, index=None, label=None, parser=None, p_type=None, url_header=None):
+        """ Register a document with the framework """
+        results, label = TextProcessor._parse(filename, index, label, parser, p_type, url_header)
+
         # Save / integrate the data we extracted from the file
         # into the internal state of the framework
         self.filecount += 1
         self._save_results(label, results)
 
-    def load_stop_words(stopfile, word_list):
-        """ generates a list of common or stop words found in a list of words """
+    def load_texts(self, filenames, indices=None, labels=None, parser=None, p_type=None, url_header=None,
+                   workers=4, chunksize=None):
+        """ Register many documents, parsed in parallel by a pool of worker processes
+        filenames: list of files (repeat the file for several rows of one csv)
+        indices, labels: optional lists, one per file (as in load_text)
+        parser, p_type, url_header: as in load_text (parser must be a module level function)
+        workers: number of worker processes (0 parses in this process)
+        chunksize: number of documents sent to a worker at a time (default about 4 chunks per worker)
+        Documents are registered in the order of filenames, whatever order they finish in """
+        n = len(filenames)
+        indices = [None] * n if indices is None else indices
+        labels = [None] * n if labels is None else labels
+        parse = partial(TextProcessor._parse, parser=parser, p_type=p_type, url_header=url_header)
+
+        if workers:
+            with ProcessPoolExecutor(workers) as executor:
+                parsed = list(executor.map(parse, filenames, indices, labels,
+                                           chunksize=chunksize or TextProcessor._chunksize(n, workers)))
+        else:
+            parsed = list(map(parse, filenames, indices, labels))
+
+        for results, label in parsed:
+            self.filecount += 1
+            self._save_results(label, results)
+
+    def load_corpus(self, filename, start=0, stop=None, url_header=None, text_col=0, url_col=1, workers=0):
+        """ Register a range of documents from a csv with one text per row (e.g. tedtalks.csv)
+        The csv is read once, keeping only the text (and url) columns of rows start to stop
+        filename: csv file, one document per row
+        start, stop: range of rows to load (0 = first row after the header, stop=None reads to the end)
+        url_header: if given, each document is labeled by the title in its url (see title_from_url),
+                    otherwise by the filename and row number
+        text_col, url_col: positions of the text and url columns
+        workers: number of worker processes parsing the texts (0 parses in this process) """
+
+        # read only the needed columns and rows (usecols keeps the columns in file order)
+        cols = sorted({text_col, url_col}) if url_header is not None else [text_col]
+        nrows = None if stop is None else stop - start
+        df = pd.read_csv(filename, usecols=cols, skiprows=range(1, start + 1), nrows=nrows)
+        texts = df.iloc[:, cols.index(text_col)]
+        urls = df.iloc[:, cols.index(url_col)] if url_header is not None else None
+
+        # parse every document, in parallel if asked (results come back in row order)
+        if workers:
+            with ProcessPoolExecutor(workers) as executor:
+                parsed = list(executor.map(TextProcessor._parse_text, texts,
+                                           chunksize=TextProcessor._chunksize(len(texts), workers)))
+        else:
+            parsed = [TextProcessor._parse_text(text) for text in texts]
 
-        stop_list = ['like', 'applause', 'laughter', 'us', 'one', 'going', 'really',
-                     'much', 'also', 'got', 'would', 'said']
+        # register every document
+        for i, results in enumerate(parsed):
+            if url_header is not None:
+                label = title_from_url(urls.iloc[i], url_header)
+            else:
+                label = f'{filename} {start + i}'
 
-        # identifies words in the text file that exist in stopfile, adds to stop list
-        for word in word_list:
-            if word in stopfile:
-                stop_list.append(word)
+            self.filecount += 1
+            self._save_results(label, results)
 
-        return set(stop_list)
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def stop_words():
+        """ the set of words removed from every document, resolved once per process:
+        nltk's english stop words (the bundled copy if the nltk corpus is not installed)
+        plus common ted talk words """
+        try:
+            from nltk.corpus import stopwords
+            english = stopwords.words('english')
 
-    def intersect_words(self):
-        """ finds the words present in all text files """
+        except (ImportError, LookupError):
+            english = ENGLISH_STOP_WORDS
 
-        # create a list of sets for all the words in each file
-        set_list = []
-        for file, results in self.data.items():
-            set_list.append(set(results['word_count'].keys()))
+        return frozenset(english).union(TALK_STOP_WORDS)
 
-        # intersect each set onto itself until none are left
-        idx = 0
-        setA = set_list[0]
-        while idx < (len(set_list) - 1):
-            setB = setA.intersection(set_list[idx + 1])
-            setA = setB
-            idx += 1
+    @staticmethod
+    def load_stop_words(stopfile, word_list):
+        """ generates a set of common or stop words found in a list of words """
+
+        # words in the text file that exist in stopfile, plus the common ted talk words
+        return set(word_list).intersection(stopfile).union(TALK_STOP_WORDS)
+
+    def _intersect_ids(self):
+        """ vocabulary ids of the words present in all text files, most common first
+        (kept until the next document is loaded) """
+        if self._ranked is None:
+            # a word is in every file if every document counted it
+            inter = np.flatnonzero(self.doc_freq[:len(self.words)] == self.num_docs) if self.num_docs else []
+            inter = np.asarray(inter, dtype=np.int64)
+            self._ranked = inter[np.argsort(-self.totals[inter], kind='stable')]
 
-        # return set of words present in all text files
-        return setA
+        return self._ranked
+
+    def intersect_words(self):
+        """ finds the words present in all text files """
+        return {self.words[i] for i in self._intersect_ids()}
 
     def top_k(self, k=3):
         """finds a user specified amount of most common words
@@ -111,7 +295,7 @@ class TextProcessor:
 
         try:
             # identify the words that appear in all files
-            inter_words = self.intersect_words()
+            inter_words = self._intersect_ids()
 
             # cannot output more words than what already exists in the intersection
             assert k <= len(inter_words), 'k is too large'
@@ -121,15 +305,11 @@ class TextProcessor:
             raise OutOfRangeError(k, str(ae))
 
         else:
-            inter_counts = defaultdict(lambda: 0)
-            for w in inter_words:
-                for file, results in self.data.items():
-                    inter_counts[w] += results['word_count'][w]
-
-            # find top k words across all files
-            top_k = sort_limit_dict(inter_counts, limit=k)
+            # find top k words across all files (the intersection is already ranked by total count)
+            if k not in self._top:
+                self._top[k] = {self.words[i]: int(self.totals[i]) for i in inter_words[:k]}
 
-            return top_k
+            return dict(self._top[k])
 
     def numwords_barchart(self, k=5):
         """ generates subplots showing a user specified amount of
@@ -158,7 +338,9 @@ class TextProcessor:
 
             # find the most common words from each file
             for idx, file in enumerate(self.data):
-                top_words = sort_limit_dict(self.data[file]['word_count'], limit=k)
+                results = self.data[file]
+                top = np.argsort(-results['counts'], kind='stable')[:k]
+                top_words = {self.words[results['word_ids'][i]]: int(results['counts'][i]) for i in top}
 
                 # bar plot the words and their frequencies
                 fig.add_trace(
@@ -175,15 +357,15 @@ class TextProcessor:
         using a Sankey diagram, where the thickness of the line
         is the number of times that word occurs in the text. """
 
-        # build rows in the dataframe (i.e. [filename, word, word_count])
-        rows = []
-        for file, results in self.data.items():
-            for word in self.top_k(k).keys():
-                row_data = file, word, results['word_count'][word]
-                rows.append(row_data)
+        # counts of the top k words in each file (i.e. [filename, word, word_count] rows)
+        top = list(self.top_k(k).keys())
+        counts = self.doc_term()[:, [self.vocab[w] for w in top]].toarray()
 
         # source = filenames, target = words, values = wordcounts
-        df = pd.DataFrame(rows, columns=['src', 'targ', 'vals'])
+        files = [file for file, results in self.data.items() if 'word_ids' in results]
+        df = pd.DataFrame({'src': np.repeat(files, len(top)),
+                           'targ': np.tile(top, len(files)),
+                           'vals': counts.ravel()})
 
         # generate sankey diagram
         sk.make_sankey(df, 'src', 'targ', vals='vals')
@@ -199,11 +381,11 @@ class TextProcessor:
         rows = []
 
         # for each file, find the longest word and its length
+        lengths = np.array(self.lengths)
         for file, results in self.data.items():
-            lw = sort_limit_dict(results['word_length'], limit=1)
-            for k, v in lw.items():
-                l_word = k
-                l_length = v
+            ids = results['word_ids']
+            l_word = self.words[ids[np.argmax(lengths[ids])]]
+            l_length = len(l_word)
 
             # count the vowels in the longest word
             v_count = 0
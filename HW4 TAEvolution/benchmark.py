@@ -0,0 +1,151 @@
+"""
+Avril Mauro & Katelyn Donn
+DS 3500 Homework 4 -- Evo Benchmarks on Synthetic TA Schedules
+"""
+
+import datetime
+import os
+import random as rnd
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+from evo import Evo
+from ta_criteria import compile_criteria, add_criteria, criteria_bounds
+from convergence import Convergence
+from hw4_evo import swapper, flip, reduce
+
+# section meeting days and times to draw from
+DAYS = ['M', 'T', 'W', 'R', 'F']
+TIMES = ['800-940', '950-1130', '1145-125', '135-315', '250-430', '440-630']
+
+# instance sizes (tas, sections) run by main
+SIZES = [(43, 17), (200, 50), (500, 120), (2000, 500)]
+
+
+def generate_instance(tas=43, sections=17, seed=0):
+    """ Generates a synthetic ta / section instance with the same columns as tas.csv and sections.csv
+        Preferences, ta limits and section sizes follow the distributions of the real files
+        (about 2/3 unwilling, most tas take 1-2 sections, small sections need 2 tas, large ones 3)
+        Returns: ta_df, sections_df (dataframes) """
+    rng = np.random.default_rng(seed)
+
+    # sections: a random day/time, small (19 students) or large (35-40) with matching ta limits
+    large = rng.random(sections) < 0.6
+    min_ta = np.where(large, 3, 2)
+    sections_df = pd.DataFrame({'section': range(sections),
+                                'instructor': ['instructor ' + str(i % 20) for i in range(sections)],
+                                'daytime': [rng.choice(DAYS) + ' ' + rng.choice(TIMES) for _ in range(sections)],
+                                'location': 'ONLINE',
+                                'students': np.where(large, rng.integers(35, 41, sections), 19),
+                                'topic': 'DS',
+                                'min_ta': min_ta,
+                                'max_ta': min_ta + 1})
+
+    # tas: each ta is available for a different share of sections, and prefers some of those
+    available = rng.beta(2, 4, size=(tas, 1))
+    draw = rng.random((tas, sections))
+    prefs = np.where(draw < available * 0.4, 'P', np.where(draw < available, 'W', 'U'))
+    ta_df = pd.DataFrame({'ta_id': range(tas),
+                          'name': ['ta ' + str(i) for i in range(tas)],
+                          'max_assigned': rng.choice([0, 1, 2, 3], size=tas, p=[0.05, 0.63, 0.3, 0.02])})
+    ta_df = pd.concat([ta_df, pd.DataFrame(prefs, columns=[str(i) for i in range(sections)])], axis=1)
+
+    return ta_df, sections_df
+
+
+def random_solution(ta_df, sections_df, seed=0):
+    """ Starting solution: each ta assigned to max_assigned random sections """
+    rng = np.random.default_rng(seed)
+    L = np.zeros((len(ta_df), len(sections_df)), dtype=np.int64)
+    for ta, k in enumerate(ta_df['max_assigned']):
+        L[ta, rng.choice(len(sections_df), size=k, replace=False)] = 1
+    return L
+
+
+def build(ta_df, sections_df, seed=0):
+    """ Builds an evo framework for a synthetic instance with the TA criteria and agents """
+    E = Evo()
+    crits = compile_criteria(ta_df, sections_df)
+    add_criteria(E, crits)
+    E.convergence = Convergence(ref=criteria_bounds(crits))
+    E.add_agent("swapper", swapper, delta=True)
+    E.add_agent("flip", flip)
+    E.add_agent("reduce", reduce, delta=True)
+    E.add_solution(random_solution(ta_df, sections_df, seed))
+    return E
+
+
+def commit():
+    """ The git commit being benchmarked (so results can be compared across commits) """
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def run_benchmark(tas=43, sections=17, n=5000, samples=10, seed=0, **kwargs):
+    """ Runs a fixed-seed, fixed-budget evolve session on a synthetic instance
+        n       - # of agent invocations (the budget)
+        samples - # of times the run is measured along the way
+        kwargs  - passed on to evolve (e.g. batch, workers)
+        Returns: dataframe with one row per sample (evaluations/sec, dominance cost, front size) """
+    ta_df, sections_df = generate_instance(tas, sections, seed)
+    rnd.seed(seed)
+    E = build(ta_df, sections_df, seed)
+
+    rows = []
+    start = time.perf_counter()
+
+    def sample(metrics):
+        """ evolve callback: record the state of the run """
+        summary = metrics.summary()
+        rows.append({'iteration': E.iteration,
+                     'elapsed': time.perf_counter() - start,
+                     'evaluations': summary['evaluations'],
+                     'evaluations/sec': summary['evaluations/sec'],
+                     'fitness seconds': summary['fitness seconds'],
+                     'dominance seconds': summary['dominance seconds'],
+                     'agent seconds': summary['agent seconds'],
+                     'front size': E.size()})
+
+    E.evolve(n, status=max(1, n // samples), time_limit=float('inf'), callback=sample, **kwargs)
+
+    df = pd.DataFrame(rows)
+    df.insert(0, 'seed', seed)
+    df.insert(0, 'sections', sections)
+    df.insert(0, 'tas', tas)
+    return df
+
+
+def save_results(df, path='benchmark_results.csv'):
+    """ Appends benchmark rows to a csv, tagged with the commit and date they were run on """
+    df = df.copy()
+    df.insert(0, 'date', datetime.datetime.now().isoformat(timespec='seconds'))
+    df.insert(0, 'commit', commit())
+    df.to_csv(path, mode='a', index=False, header=not os.path.exists(path))
+
+
+def compare(path='benchmark_results.csv'):
+    """ Final evaluations/sec, dominance seconds and front size of each instance, one column per commit """
+    df = pd.read_csv(path)
+    last = df.groupby(['commit', 'tas', 'sections', 'seed']).last().reset_index()
+    return last.pivot_table(index=['tas', 'sections', 'seed'], columns='commit',
+                            values=['evaluations/sec', 'dominance seconds', 'front size'])
+
+
+def main():
+    """ Benchmarks every instance size and records the results """
+    for tas, sections in SIZES:
+        print(f'Benchmarking {tas} tas x {sections} sections ...')
+        df = run_benchmark(tas, sections, n=5000)
+        print(df.iloc[-1].to_string(), '\n')
+        save_results(df)
+
+    print(compare())
+
+
+if __name__ == '__main__':
+    main()
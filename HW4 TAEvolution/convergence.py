@@ -0,0 +1,83 @@
+""" convergence tracking for the evo framework: hypervolume of the non-dominated set """
+
+import numpy as np
+import pandas as pd
+
+
+class Convergence:
+    """ Records the hypervolume of the non-dominated set as the population evolves
+
+    Hypervolume is the share of the box between 0 (no penalties) and a reference point that is
+    dominated by the front, estimated from a fixed set of random sample points. The points are
+    drawn once, so successive measurements are comparable, and log-uniformly on each criteria, so
+    they crowd in near 0 where a good front lives instead of in the far corner of a worst-case
+    box. A solution only leaves the front when one that dominates it arrives, so a covered point
+    stays covered and each measurement only tests the points still uncovered (a front bounded by
+    crowding eviction can lose coverage, so it is recounted instead). Lower scores are better on every criteria. """
+
+    def __init__(self, samples=4096, ref=None, seed=0):
+        """ samples - # of sample points in the estimate (more = finer, but slower)
+            ref     - reference point, ideally the worst possible scores (e.g. ta_criteria.criteria_bounds)
+                      default: a little worse than the first front on every criteria, so later
+                      solutions worse than that on some criteria add no hypervolume
+            seed    - random seed for the sample points """
+        self.samples = samples
+        self.ref = None if ref is None else np.asarray(ref, dtype=float)
+        self.seed = seed
+        self.points = None
+        self.covered = None  # which sample points the front has dominated so far
+        self.curve = []  # one dictionary per measurement
+
+    def hypervolume(self, scores, chunk=512, recount=False):
+        """ Share of the reference box dominated by the (n, criteria) score matrix (0 - 1)
+            recount - test every sample point again, not only the ones still uncovered """
+        if scores is None or len(scores) == 0:
+            return 0.0
+
+        if self.points is None:
+            if self.ref is None:
+                self.ref = scores.max(axis=0) + 1
+            rng = np.random.default_rng(self.seed)
+            self.points = (self.ref + 1) ** rng.random((self.samples, scores.shape[1])) - 1
+            self.covered = np.zeros(self.samples, dtype=bool)
+
+        if recount:
+            self.covered[:] = False
+
+        # a point is dominated if some solution is at least as good on every criteria
+        todo = np.flatnonzero(~self.covered)
+        for lo in range(0, len(todo), chunk):
+            idx = todo[lo:lo + chunk]
+            self.covered[idx] = (scores[np.newaxis] <= self.points[idx, np.newaxis]).all(-1).any(-1)
+        return int(np.count_nonzero(self.covered)) / self.samples
+
+    def update(self, iteration, scores, elapsed=0.0, accepted=0, recount=False):
+        """ Measure the front and add a point to the convergence curve
+            accepted - # of offspring accepted into the population so far
+            recount  - passed on to hypervolume
+            Returns: the hypervolume """
+        hv = self.hypervolume(scores, recount=recount)
+        size = 0 if scores is None else len(scores)
+        self.curve.append({'iteration': iteration, 'elapsed': elapsed, 'front size': size,
+                           'accepted': accepted, 'hypervolume': hv})
+        return hv
+
+    def stalled(self, window, tol=1e-3):
+        """ True if the front covered less than tol of what it had left uncovered over the last window iterations """
+        if not self.curve or self.curve[-1]['iteration'] - self.curve[0]['iteration'] < window:
+            return False
+
+        last = self.curve[-1]
+        before = [row for row in self.curve if row['iteration'] <= last['iteration'] - window][-1]
+        uncovered = 1 - before['hypervolume']
+        if uncovered <= 0:
+            return True
+        return (last['hypervolume'] - before['hypervolume']) / uncovered < tol
+
+    def to_frame(self):
+        """ The convergence curve as a dataframe (one row per measurement) """
+        return pd.DataFrame(self.curve, columns=['iteration', 'elapsed', 'front size', 'accepted', 'hypervolume'])
+
+    def reset(self):
+        """ Forget the curve (the reference point and sample points are kept) """
+        self.curve = []
@@ -3,194 +3,730 @@
 
 import random as rnd
 import copy
-from functools import reduce
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
 import time
+import tracemalloc
 import pandas as pd
 import numpy as np
+from pareto import ParetoArchive
+from fitness_pool import FitnessPool, score_files
+from metrics import EvoMetrics
+from convergence import Convergence
+from schedulers import UniformScheduler
+from sparse_schedule import SparseSchedule
 
 
-class Evo:
+def writable(L):
+    """ Copy-on-write for agents: returns L itself if it may be modified in place,
+        otherwise a private copy (solutions handed out by the population are read-only) """
+    if L.flags.writeable:
+        return L
+    Evo.copies += 1
+    return L.copy()
+
 
-    def __init__(self, timer=20):
-        self.pop = {}  # ((eval1, sol1), (eval2, sol2), ...) ==> solution
+class Evo:
+    copies = 0  # solution arrays copied for agents (see writable) or unpacked from bit-packed storage
+
+    def __init__(self, timer=20, cow=True, packed=True, cache=10000, limit=None, views=1024):
+        """ cow    - hand agents read-only views of the population (copy-on-write through writable)
+                     instead of deep copies
+            packed - store 0/1 solutions bit-packed (np.packbits), 1 bit per cell instead of 64
+                     (SparseSchedule solutions are always stored as they are)
+            cache  - # of evals remembered by solution digest, least recently used first out (0 = off)
+            limit  - max population size, the most crowded solutions are evicted past it (None = unbounded)
+            views  - # of unpacked, read-only population members kept for handing out to agents,
+                     least recently used first out (with packed=True, a member is only unpacked
+                     again once it falls out of this cache) """
+        self.cow = cow
+        self.packed = packed
+        self.cache_size = cache
+        self.cache = OrderedDict()  # digest ==> eval, oldest use first
+        self.views_size = views
+        self.views = OrderedDict()  # digest ==> read-only unpacked solution, oldest use first
+        self.hits = 0  # solutions whose eval came from the cache
+        self.misses = 0  # solutions that had to be scored
+        self.iteration = 0  # agent invocations over every evolve call (kept by checkpoints)
+        self.metrics = EvoMetrics()  # per-agent and run-wide timing / acceptance counters
+        self.convergence = Convergence()  # hypervolume of the front over the run
+        self.scheduler = UniformScheduler()  # chooses the agent evolve runs next
+        self.shape = None  # shape of a solution, needed to unpack them
+        self.pop = {}  # digest of solution ==> solution (bit-packed if packed)
+        self.evals = {}  # digest ==> ((name1, score1), (name2, score2), ...)
+        self.archive = ParetoArchive(limit)  # keeps the digests in pop non-dominated as solutions arrive
         self.fitness = {}  # name -> objective func
         self.agents = {}  # name -> (agent operator, # input solutions)
         self.crits = {}  # func --> crit
+        self.batched = set()  # names of criteria that score a stack of solutions at once
+        self.terms = {}  # name -> (terms func, axis) for criteria that sum per-row or per-column penalties
+        self.partials = {}  # digest -> {name: cached per-row/per-column penalties of that solution}
+        self.delta = set()  # names of agents that report which rows/columns they changed
+        self.batch_agents = set()  # names of agents that return a (N, rows, cols) stack of offspring
 
     def size(self):
         """ The size of the solution population """
         return len(self.pop)
 
-    def add_fitness_criteria(self, name, f, c):
+    def add_fitness_criteria(self, name, f, c, batch=False, terms=None, axis=0):
         """ Registering an objective with the Evo framework
-        name - The name of the objective (string)
-        f    - The objective function:   f(solution)--> a number
-        c    - The criteria (part of df we're analyzing)
+        name  - The name of the objective (string)
+        f     - The objective function:   f(solution)--> a number
+        c     - The criteria (part of df we're analyzing)
+        batch - True if f also accepts a stacked (k, rows, cols) array of solutions
+                and returns a (k,) array of scores
+        terms - Optional per-row (axis=0) or per-column (axis=1) penalties whose sum is f:
+                terms(solution, c, idx) --> array of penalties for the rows/columns in idx (None = all)
+                Lets delta agents rescore only the rows/columns they changed
         """
         self.fitness[name] = f
         self.crits[name] = c
+        if batch:
+            self.batched.add(name)
+        if terms is not None:
+            self.terms[name] = (terms, axis)
 
-    def add_agent(self, name, op, k=1):
+    def add_agent(self, name, op, k=1, delta=False, batch=False):
         """ Registering an agent with the Evo framework
-        name - The name of the agent
-        op   - The operator - the function carried out by the agent  op(*solutions)-> new solution
-        k    - The number of input solutions (usually 1) """
+        name  - The name of the agent
+        op    - The operator - the function carried out by the agent  op(*solutions)-> new solution
+                (the solutions are read-only, call writable(solution) before changing one in place)
+        k     - The number of input solutions (usually 1)
+        delta - True if op changes a single parent (k=1) and returns (new solution, rows, cols),
+                the indices of every row and column holding a changed cell
+        batch - True if op returns a stacked (N, rows, cols) array of new solutions,
+                which are scored together with add_solutions """
         self.agents[name] = (op, k)
+        if delta:
+            self.delta.add(name)
+        if batch:
+            self.batch_agents.add(name)
+
+    def set_scheduler(self, scheduler):
+        """ Replace the agent scheduler used by evolve
+            scheduler - object with pick(agent names, metrics) --> agent name
+                        (see schedulers.py, e.g. BanditScheduler) """
+        self.scheduler = scheduler
+
+    def _pack(self, sol):
+        """ Storage form of a solution and its content digest (the key of the population) """
+        if not isinstance(sol, SparseSchedule):
+            sol = np.asarray(sol)
+        if self.shape is None:
+            self.shape = sol.shape
+
+        stored = np.packbits(sol, axis=None) if self.packed and isinstance(sol, np.ndarray) else sol
+        return stored, self._digest(stored)
+
+    @staticmethod
+    def _digest(stored):
+        """ Content digest of a stored solution """
+        if isinstance(stored, SparseSchedule):
+            return stored.digest()
+        return hashlib.blake2b(np.ascontiguousarray(stored).tobytes(), digest_size=16).digest()
+
+    def _unpack(self, stored):
+        """ A stored solution as a (rows, cols) array (sparse solutions are returned as they are)
+            Unpacking allocates a new array, so it is counted in Evo.copies """
+        if not self.packed or isinstance(stored, SparseSchedule):
+            return stored
+        Evo.copies += 1
+        return np.unpackbits(stored, count=int(np.prod(self.shape))).reshape(self.shape)
+
+    def items(self):
+        """ The (eval, solution) pairs of the population """
+        for digest, stored in self.pop.items():
+            yield self.evals[digest], self._unpack(stored)
+
+    def _handout(self, sol):
+        """ A solution as given to an agent: the read-only array itself (copy-on-write)
+            or a deep copy when copy-on-write is off """
+        if self.cow:
+            return sol
+        Evo.copies += 1
+        return copy.deepcopy(sol)
+
+    def _viewable(self, sol):
+        """ True if sol can be kept in the views cache as it is (a dense packed solution that is not
+            a slice of a larger array, e.g. a batch agent's stack, which it would keep alive) """
+        return (self.packed and isinstance(sol, np.ndarray) and self.views_size > 0
+                and (sol.base is None or sol.base.size == sol.size))
+
+    def _keep_view(self, digest, sol):
+        """ Keep a read-only view of a population member for handing out to agents """
+        view = sol.view()
+        view.flags.writeable = False
+        self.views[digest] = view
+        if len(self.views) > self.views_size:
+            self.views.popitem(last=False)
+        return view
+
+    def _view(self, digest):
+        """ A population member as a read-only (rows, cols) array, unpacked at most once
+            while it stays in the views cache """
+        stored = self.pop[digest]
+        if not self.packed or isinstance(stored, SparseSchedule):
+            return stored
+
+        view = self.views.get(digest)
+        if view is None:
+            view = self._unpack(stored)
+            if self.views_size:
+                return self._keep_view(digest, view)
+            view.flags.writeable = False
+        else:
+            self.views.move_to_end(digest)
+        return view
 
     def get_random_solutions(self, k=1):
         """ Pick k random solutions from the population as a list of solutions
-            We are returning DEEP copies of these solutions as a list """
+            These are read-only views (agents copy them with writable before mutating),
+            or DEEP copies if copy-on-write is off """
         if self.size() == 0:  # No solutions in the populations
             return []
         else:
-            popvals = tuple(self.pop.values())
-            return [copy.deepcopy(rnd.choice(popvals)) for _ in range(k)]
-
-    def add_solution(self, sol):
-        """ Add a new solution to the population """
-        eval = tuple([(name, f(sol, crit=self.crits[name])) for name, f in self.fitness.items()])
-        self.pop[eval] = sol
-
-    def run_agent(self, name):
-        """ Invoke an agent against the current population """
+            digests = tuple(self.pop.keys())
+            return [self._handout(self._view(rnd.choice(digests))) for _ in range(k)]
+
+    def evaluate(self, sol, parent=None, rows=(), cols=()):
+        """ Score a solution against every fitness criteria
+            If the cached partial penalties of its parent (a digest in the population) are given,
+            criteria with terms only rescore the changed rows / columns
+            Returns: (eval, partials) """
+        cached = self.partials.get(parent, {})
+        eval, partials = [], {}
+        for name, f in self.fitness.items():
+            crit = self.crits[name]
+            if name not in self.terms:
+                eval.append((name, f(sol, crit=crit)))
+                continue
+
+            terms, axis = self.terms[name]
+            if name in cached:
+                # copy the parent's penalties and rescore only what the agent touched
+                t = cached[name].copy()
+                idx = rows if axis == 0 else cols
+                if len(idx) > 0:
+                    t[idx] = terms(sol, crit, idx)
+            else:
+                t = terms(sol, crit, None)
+            partials[name] = t
+            eval.append((name, t.sum()))
+
+        return tuple(eval), partials
+
+    def _insert(self, eval, sol, partials=None, stored=None, digest=None, offspring=False):
+        """ Offer a scored solution to the population through the pareto archive
+            Duplicates and dominated solutions are rejected, solutions the new one dominates are evicted
+            offspring - sol is a new agent offspring no one else writes to, so a read-only view of it
+                        is kept as its handout (a bit-packed member is then never unpacked)
+            Returns: True if the solution joined the population """
+        if digest is None:
+            stored, digest = self._pack(sol)
+        if digest in self.pop:
+            return False
+
+        t0 = time.perf_counter()
+        accepted, evicted = self.archive.add(digest, [score for _, score in eval])
+        self.metrics.dominance(time.perf_counter() - t0)
+        for key in evicted:
+            del self.pop[key]
+            del self.evals[key]
+            self.partials.pop(key, None)
+            self.views.pop(key, None)
+
+        if accepted:
+            # stored solutions are never modified, agents copy them on write
+            # (a read-only view is frozen, so the caller's own array stays writable)
+            if isinstance(stored, np.ndarray):
+                stored = stored.view()
+                stored.flags.writeable = False
+            self.pop[digest] = stored
+            self.evals[digest] = eval
+            if partials:
+                self.partials[digest] = partials
+            if offspring and self._viewable(sol):
+                self._keep_view(digest, sol)
+
+        return accepted
+
+    def _recall(self, digest):
+        """ The cached eval of a solution seen before (None if it has to be scored) """
+        if digest in self.cache:
+            self.cache.move_to_end(digest)
+            self.hits += 1
+            return self.cache[digest]
+        self.misses += 1
+        return None
+
+    def _remember(self, digest, eval):
+        """ Cache the eval of a solution, dropping the least recently used one if full """
+        if self.cache_size > 0:
+            self.cache[digest] = eval
+            self.cache.move_to_end(digest)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def cache_info(self):
+        """ Size and hit/miss counts of the fitness cache """
+        lookups = self.hits + self.misses
+        return {'size': len(self.cache), 'max size': self.cache_size,
+                'hits': self.hits, 'misses': self.misses,
+                'hit rate': self.hits / lookups if lookups else 0.0}
+
+    def add_solution(self, sol, parent=None, rows=(), cols=(), offspring=False):
+        """ Add a new solution to the population (if it is new and not dominated)
+            Exact duplicates of a solution in the population are rejected before scoring,
+            solutions scored before take their eval from the cache
+            parent, rows, cols - the delta reported by a delta agent (see evaluate)
+            offspring - sol was just made by an agent (see _insert) """
+        stored, digest = self._pack(sol)
+        if digest in self.pop:
+            return False
+
+        eval = self._recall(digest)
+        if eval is not None:
+            return self._insert(eval, sol, stored=stored, digest=digest, offspring=offspring)
+
+        t0 = time.perf_counter()
+        eval, partials = self.evaluate(sol, parent, rows, cols)
+        self.metrics.fitness(time.perf_counter() - t0)
+        self._remember(digest, eval)
+        return self._insert(eval, sol, partials, stored, digest, offspring=offspring)
+
+    def add_solutions(self, batch):
+        """ Add a batch of new solutions to the population, scoring them together
+            batch - list of solutions (or a stacked (k, rows, cols) array)
+            Batch criteria are called once for the whole stack, the rest once per solution
+            Returns: list of True/False, whether each solution joined the population """
+
+        # drop duplicates (of the population or within the batch) and cache hits before scoring
+        accepted = [False] * len(batch)
+        packs, seen, unique, positions = [], set(), [], []
+        for pos, sol in enumerate(batch):
+            stored, digest = self._pack(sol)
+            if digest in self.pop or digest in seen:
+                continue
+            seen.add(digest)
+
+            eval = self._recall(digest)
+            if eval is not None:
+                accepted[pos] = self._insert(eval, sol, stored=stored, digest=digest)
+            else:
+                packs.append((stored, digest))
+                unique.append(sol)
+                positions.append(pos)
+        if not unique:
+            return accepted
+
+        t0 = time.perf_counter()
+        dense = isinstance(unique[0], np.ndarray)
+        batch = np.asarray(unique) if dense else unique
+        scores = {}
+        for name, f in self.fitness.items():
+            if name in self.batched and dense:
+                scores[name] = np.asarray(f(batch, crit=self.crits[name])).tolist()
+            else:
+                scores[name] = [f(sol, crit=self.crits[name]) for sol in batch]
+        self.metrics.fitness(time.perf_counter() - t0, len(batch))
+
+        for i, sol in enumerate(batch):
+            eval = tuple([(name, scores[name][i]) for name in self.fitness])
+            stored, digest = packs[i]
+            self._remember(digest, eval)
+            accepted[positions[i]] = self._insert(eval, sol, stored=stored, digest=digest)
+
+        return accepted
+
+    def make_offspring(self, name):
+        """ Invoke an agent against the current population and return its new solution
+            (a stack of new solutions for batch agents) """
         op, k = self.agents[name]
         picks = self.get_random_solutions(k)
+        t0 = time.perf_counter()
         new_solution = op(picks)
-        self.add_solution(new_solution)
+        self.metrics.agent_call(name, time.perf_counter() - t0)
+        if name in self.delta:
+            return new_solution[0]
+        return new_solution
+
+    def _offspring(self, name):
+        """ Invoke an agent and return its new solutions as a list """
+        new_solution = self.make_offspring(name)
+        if name in self.batch_agents:
+            return list(new_solution)
+        return [new_solution]
+
+    def run_agent(self, name):
+        """ Invoke an agent against the current population """
+        if name in self.batch_agents:
+            # score the whole stack of offspring in one vectorized pass
+            self._add_offspring([(name, sol) for sol in self.make_offspring(name)])
+            return
+
+        if name in self.delta and self.size() > 0:
+            # remember the parent so only the changed rows/columns get rescored
+            op, k = self.agents[name]
+            parent = rnd.choice(tuple(self.pop.keys()))
+            picks = [self._handout(self._view(parent))]
+            t0 = time.perf_counter()
+            new_solution, rows, cols = op(picks)
+            self.metrics.agent_call(name, time.perf_counter() - t0)
+            accepted = self.add_solution(new_solution, parent=parent, rows=rows, cols=cols, offspring=True)
+        else:
+            accepted = self.add_solution(self.make_offspring(name), offspring=True)
+        self.metrics.offspring(name, accepted)
+
+    def profile_allocations(self, n=1000):
+        """ Runs n random agents and measures their solution copies and memory use
+            (compare Evo(cow=True) against Evo(cow=False) to see the allocations saved; bit-packed
+            members are handed out from the views cache, so only cache misses count as copies)
+            Returns: dictionary of agent calls/sec, copies/sec and peak traced memory (MB) """
+        agent_names = list(self.agents.keys())
+        copies = Evo.copies
+
+        tracemalloc.start()
+        start = time.time()
+        for _ in range(n):
+            self.run_agent(rnd.choice(agent_names))
+        elapsed = time.time() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {'agent calls/sec': n / elapsed,
+                'copies/sec': (Evo.copies - copies) / elapsed,
+                'peak MB': peak / 2 ** 20}
 
     def run_tests(self, tests):
         """ Runs evo framework on test solutions, tests = list of filenames (.csv)
             Returns: dataframe and .csv export of fitness criteria error scores """
 
-        # add each test solution to the evo framework
-        for filename in tests:
-            L = np.array(pd.read_csv(filename, header=None))
-            self.add_solution(L)
+        # score each test solution (without the population, so dominated tests are still reported)
+        # one row per test, indexed by the filename without .csv
+        df = self.score_files(tests, workers=0)
 
-        # build the rows of the dataframe (fitness criteria error scores)
-        rows = []
-        for eval, sol in self.pop.items():
-            rows.append(dict(eval))
-
-        # name the columns the filenames without .csv
         # display dataframe transposed so that the criteria are the index
-        cols = [i[:-4] for i in tests]
-        df = pd.DataFrame(rows, columns=list(self.fitness.keys())).set_index([cols]).T
+        df = df.rename_axis(None).T
         print(df)
 
         # export as a .csv to system's Downloads folder
         df.to_csv("~/Downloads/test_results.csv")
 
+    def score_files(self, files, workers=4, out=None, chunksize=64):
+        """ Bulk-scores solution files (e.g. an archive of schedules) without touching the population
+            files     - a directory (every .csv in it is scored) or a list of filenames
+            workers   - # of worker processes (0 scores in this process)
+            out       - optional .csv to write the results table to
+            chunksize - # of files handed to a worker at a time
+            Returns: dataframe with one row per file (indexed by filename without .csv), one column per criteria
+                     (plus an error column if some files could not be scored) """
+        if isinstance(files, (str, os.PathLike)):
+            files = sorted(os.path.join(files, f) for f in os.listdir(files) if f.endswith('.csv'))
+
+        # rows come back in the order of files, so every file keeps its own row and labels line up
+        results = list(score_files(files, self.fitness, self.crits, self.shape,
+                                   workers=workers, chunksize=chunksize))
+
+        names = [os.path.splitext(os.path.basename(f))[0] for f in files]
+        df = pd.DataFrame([scores for _, scores, _ in results], columns=list(self.fitness.keys()),
+                          index=pd.Index(names, name='file'))
+
+        # files that could not be scored keep their row, with NaN scores and the reason
+        errors = [error for _, _, error in results]
+        if any(errors):
+            df['error'] = errors
+        if out is not None:
+            df.to_csv(out)
+        return df
+
+    def scores(self):
+        """ The population's scores as one (n, criteria) matrix, rows in ascending order of total
+            (the pareto archive's matrix, so nothing is rebuilt from the evals)
+            Returns: (list of solution digests, score matrix) """
+        if self.archive.scores is None:
+            return [], np.zeros((0, len(self.fitness)), dtype=np.int64)
+
+        # integer criteria are reported as integers
+        scores = self.archive.scores
+        if np.array_equal(scores, np.round(scores)):
+            scores = scores.astype(np.int64)
+        return list(self.archive.keys), scores
+
     def display_best(self):
         """ Finds the best solution among all populations (min sum of criteria errors)
             Returns: dataframe and exported .csv of best solution """
+        if self.size() == 0:
+            return ""
 
-        # default min is the size of one solution
-        min = list(self.pop.values())[0].size
-        solution = ""
+        # the archive is sorted by total, so the best solution is its first row
+        keys, scores = self.scores()
+        sol = self._unpack(self.pop[keys[0]])
+        solution = str(dict(zip(self.fitness.keys(), scores[0].tolist())))
 
-        # for each solution in the populations
-        for eval, sol in self.pop.items():
-            # calculate the sum of criteria errors
-            if sum(dict(eval).values()) < min:
-                # update minimum value and best solution
-                min = sum(dict(eval).values())
-                solution = str(dict(eval))
-
-                # display the best solution as a dataframe and export as .csv
-                sol_df = pd.DataFrame(sol, columns=range(sol.shape[1]))
-                sol_df.to_csv("~/Downloads/best_solution.csv")
+        # display the best solution as a dataframe and export as .csv
+        dense = sol.to_dense() if isinstance(sol, SparseSchedule) else sol
+        sol_df = pd.DataFrame(dense, columns=range(sol.shape[1]))
+        sol_df.to_csv("~/Downloads/best_solution.csv")
 
         return solution + "\n\n" + str(sol)
 
     def display_summary(self, name=None):
-        """ Displays a dataframe of criteria error scores for every solution in populations """
+        """ Displays a dataframe of criteria error scores for every solution in populations
+            (one row per solution, best total first) """
 
         # solution name column
         if name is None:
             name = 'dslayp'
 
-        # build rows (scores for each solution) and columns (fitness criteria)
-        rows = []
-        cols = list(self.fitness.keys())
-        for eval, sol in self.pop.items():
-            row = dict(eval).values()
-            rows.append(row)
-
-        # build a dataframe showing criteria error scores for each solution
-        df = pd.DataFrame(rows, columns=cols[::-1]).reset_index(drop=True)
-        df['groupname'] = [name for i in range(len(df))]
-        df = df.iloc[:, ::-1]
+        # build a dataframe showing criteria error scores for each solution straight from the score matrix
+        _, scores = self.scores()
+        df = pd.DataFrame(scores, columns=list(self.fitness.keys()))
+        df.insert(0, 'groupname', name)
 
         return df
 
-    def evolve(self, n=1, dom=100, status=100, time_limit=600, name=None):
+    def report(self, elapsed, name=None):
+        """ Display total runtime, best solution, and summary of criteria error scores
+            and export the summary table as a .csv """
+        print("\n ------------------ \nRUNTIME:",
+              round(elapsed/60, 2),
+              "MINUTES\n ------------------ \n")
+        print(self.display_best(), '\n')
+        summary = self.display_summary(name=name)
+        print(summary)
+
+        # export summary table as a .csv
+        summary.to_csv("~/Downloads/evo_summary.csv")
+
+        # display and export the convergence curve (hypervolume of the front over the run)
+        if self.convergence.curve:
+            curve = self.convergence.to_frame()
+            print("\nCONVERGENCE\n", curve.tail(10).to_string(index=False))
+            curve.to_csv("~/Downloads/evo_convergence.csv", index=False)
+
+    def _collect(self, results):
+        """ Add the (solution, eval, agent name) results scored by the worker pool """
+        for sol, eval, name in results:
+            stored, digest = self._pack(sol)
+            self._remember(digest, eval)
+            self.metrics.fitness(0.0)  # scored on a worker, only the evaluation is counted here
+            self.metrics.offspring(name, self._insert(eval, sol, stored=stored, digest=digest))
+
+    def _add_offspring(self, offspring):
+        """ Score a batch of (agent name, solution) offspring together """
+        accepted = self.add_solutions([sol for _, sol in offspring])
+        for (name, _), ok in zip(offspring, accepted):
+            self.metrics.offspring(name, ok)
+
+    def _flush(self, offspring, pool=None):
+        """ Score every offspring still waiting on a batch or on a worker """
+        if offspring:
+            self._add_offspring(offspring)
+        if pool is not None:
+            self._collect(pool.drain())
+
+    def save(self, path):
+        """ Checkpoint the population, scores, random state, iteration counter, run metrics
+            (so a resumed bandit scheduler keeps its statistics) and hypervolume reference point to a .npz file
+            (written to a temporary file first, so an interrupted save keeps the last checkpoint) """
+        stored = list(self.pop.values())
+        evals = [self.evals[digest] for digest in self.pop]
+        state = np.frombuffer(pickle.dumps(rnd.getstate()), dtype=np.uint8)
+        counters = {key: value for key, value in vars(self.metrics).items() if key != 'start'}
+        counters['runtime'] = time.perf_counter() - self.metrics.start  # so rates stay per second of the whole run
+        metrics = np.frombuffer(pickle.dumps(counters), dtype=np.uint8)
+        ref = self.convergence.ref if self.convergence.ref is not None else np.empty(0)
+
+        # sparse solutions are saved as stacked row pointers and concatenated column indices
+        sparse = {}
+        if stored and isinstance(stored[0], SparseSchedule):
+            sparse = {'indptr': np.stack([sol.indptr for sol in stored]),
+                      'indices': np.concatenate([sol.indices for sol in stored])}
+            stored = []
+
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f,
+                                **sparse,
+                                solutions=np.stack(stored) if stored else np.empty(0),
+                                scores=np.array([[score for _, score in eval] for eval in evals]),
+                                names=np.array(list(self.fitness.keys())),
+                                shape=np.array(self.shape if self.shape is not None else ()),
+                                packed=self.packed,
+                                iteration=self.iteration,
+                                rng=state,
+                                metrics=metrics,
+                                ref=ref)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """ Restore a checkpoint written by save (register the same fitness criteria first)
+            The convergence curve starts over, measured against the checkpoint's reference point
+            (cached evals are kept, they depend only on the solution and the criteria) """
+        with np.load(path) as ckpt:
+            names = ckpt['names'].tolist()
+            assert names == list(self.fitness.keys()), 'checkpoint criteria do not match: ' + str(names)
+            assert bool(ckpt['packed']) == self.packed, 'checkpoint packing does not match'
+
+            self.pop, self.evals, self.partials = {}, {}, {}
+            self.views.clear()
+            self.archive.clear()
+            self.shape = tuple(ckpt['shape'].tolist()) or None
+            self.iteration = int(ckpt['iteration'])
+            rnd.setstate(pickle.loads(ckpt['rng'].tobytes()))
+
+            # checkpoints from before metrics and the reference point were saved restore without them
+            if 'metrics' in ckpt.files:
+                counters = pickle.loads(ckpt['metrics'].tobytes())
+                runtime = counters.pop('runtime', 0.0)
+                self.metrics.reset()
+                vars(self.metrics).update(counters)
+                self.metrics.start = time.perf_counter() - runtime
+            ref = ckpt['ref'] if 'ref' in ckpt.files and ckpt['ref'].size else self.convergence.ref
+            self.convergence = Convergence(self.convergence.samples, ref=ref, seed=self.convergence.seed)
+
+            solutions = ckpt['solutions']
+            if 'indptr' in ckpt.files:
+                indices, ends = ckpt['indices'], np.cumsum(ckpt['indptr'][:, -1])
+                solutions = [SparseSchedule(indptr, indices[end - indptr[-1]:end], self.shape)
+                             for indptr, end in zip(ckpt['indptr'], ends)]
+
+            for stored, scores in zip(solutions, ckpt['scores'].tolist()):
+                eval = tuple(zip(names, scores))
+                self._insert(eval, None, stored=stored, digest=self._digest(stored))
+
+    def resume(self, path, n=1, **kwargs):
+        """ Restore a checkpoint and keep evolving from it, checkpointing to the same file
+            n, kwargs - passed on to evolve """
+        self.load(path)
+        self.evolve(n, checkpoint=path, **kwargs)
+
+    def evolve(self, n=1, dom=100, status=100, time_limit=600, name=None, batch=1, workers=0,
+               checkpoint=None, every=10000, callback=None, check=1000, stall=None, tol=1e-3):
         """ To run n random agents against the population
         n - # of agent invocations
-        dom - # of iterations between discarding the dominated solutions
+        dom - (unused) the pareto archive discards dominated solutions as they arrive
+        status - # of iterations between printing the population size (0 = silent)
         time_limit - # of seconds the function runs for
+        batch - # of offspring collected before scoring them together with add_solutions
+        workers - # of worker processes scoring offspring while agents keep running (0 = score here)
+        checkpoint - .npz file the search state is saved to every `every` iterations and at the end
+        callback - function called with self.metrics every `status` iterations and at the end
+        check - # of iterations between hypervolume measurements of the front (0 = off)
+        stall - stop early once the hypervolume has gained less than tol of the uncovered share in this many iterations
+                (None = run for n iterations or time_limit seconds)
         """
         agent_names = list(self.agents.keys())
+        offspring = []
+        pool = None  # started with the first offspring, once the solution shape is known
 
         # start timer
         start = time.time()
-
-        for i in range(n):
-            # calculate elapsed runtime of evolve function
-            elapsed = time.time() - start
-
-            # if elapsed time hits time limit, stop application
-            if elapsed >= time_limit:
-
-                # display total runtime, best solution, and summary of criteria error scores
-                print("\n ------------------ \nRUNTIME:",
-                      round(elapsed/60, 2),
-                      "MINUTES\n ------------------ \n")
-                print(self.display_best(), '\n')
-                print(self.display_summary(name=name))
-
-                # export summary table as a .csv
-                self.display_summary().to_csv("~/Downloads/evo_summary.csv")
-
-                # stop the framework
-                quit()
-
-            pick = rnd.choice(agent_names)  # pick an agent to run
-            self.run_agent(pick)
-
-            if i % dom == 0:
-                self.remove_dominated()
-
-            if i % status == 0:  # print the population and iteration
-                self.remove_dominated()
-                print("Iteration: ", i)
-                print("Population Size: ", self.size(), "\n")
-
-            # Clean up population
-            self.remove_dominated()
-
-
-
-    @staticmethod
-    def _dominates(p, q):
-        pscores = [score for _, score in p]
-        qscores = [score for _, score in q]
-        score_diffs = list(map(lambda x, y: y - x, pscores, qscores))
-        min_diff = min(score_diffs)
-        max_diff = max(score_diffs)
-        return min_diff >= 0.0 and max_diff > 0.0
-
-    @staticmethod
-    def _reduce_nds(S, p):
-        return S - {q for q in S if Evo._dominates(p, q)}
+        stalled = False
+        if check and not self.convergence.curve:
+            self._measure(0.0)  # the starting front (also fixes the hypervolume reference point)
+
+        try:
+            for i in range(self.iteration, self.iteration + n):
+                # calculate elapsed runtime of evolve function
+                elapsed = time.time() - start
+
+                # if elapsed time hits time limit or the front stops improving, stop evolving
+                if elapsed >= time_limit or stalled:
+
+                    # score any offspring still waiting on a batch or a worker
+                    self._flush(offspring, pool)
+                    if check:
+                        self._measure(elapsed)
+                    if checkpoint:
+                        self.save(checkpoint)
+                    if callback is not None:
+                        callback(self.metrics)
+
+                    self.report(elapsed, name=name)
+                    return
+
+                self.iteration = i + 1
+                if checkpoint and self.iteration % every == 0:
+                    self.save(checkpoint)
+
+                pick = self.scheduler.pick(agent_names, self.metrics)  # pick an agent to run
+                if workers > 0:
+                    # hand new offspring to the workers and add whatever scores have come back
+                    for sol in self._offspring(pick):
+                        assert isinstance(sol, np.ndarray), 'the worker pool only scores dense solutions'
+                        stored, digest = self._pack(sol)
+                        eval = None if digest in self.pop else self._recall(digest)
+                        if digest in self.pop or eval is not None:
+                            ok = eval is not None and self._insert(eval, sol, stored=stored, digest=digest)
+                            self.metrics.offspring(pick, ok)
+                        else:
+                            if pool is None:
+                                pool = FitnessPool(self.fitness, self.crits, sol.shape, sol.dtype,
+                                                   workers=workers)
+                            self._collect(pool.submit(sol, pick))
+
+                elif batch > 1:
+                    # hold the offspring until a full batch is ready to be scored
+                    offspring.extend((pick, sol) for sol in self._offspring(pick))
+                    if len(offspring) >= batch:
+                        self._add_offspring(offspring)
+                        offspring = []
+                else:
+                    self.run_agent(pick)
+
+                if check and self.iteration % check == 0:  # measure the front
+                    self._measure(elapsed)
+                    stalled = stall is not None and self.convergence.stalled(stall, tol)
+
+                if status and i % status == 0:  # print the population and iteration
+                    print("Iteration: ", i)
+                    print("Population Size: ", self.size(), "\n")
+                    if callback is not None:
+                        callback(self.metrics)
+
+            # score the last partial batch and anything still on a worker
+            self._flush(offspring, pool)
+            if check:
+                self._measure(time.time() - start)
+            if checkpoint:
+                self.save(checkpoint)
+            if callback is not None:
+                callback(self.metrics)
+
+        finally:
+            if pool is not None:
+                pool.close()
+
+    def _measure(self, elapsed):
+        """ Add the current front to the convergence curve (once per iteration) """
+        curve = self.convergence.curve
+        if curve and curve[-1]['iteration'] == self.iteration:
+            return curve[-1]['hypervolume']
+
+        accepted = sum(stats['accepted'] for stats in self.metrics.agents.values())
+        # crowding evictions can uncover parts of the front, so a bounded front is recounted
+        return self.convergence.update(self.iteration, self.archive.scores, elapsed, accepted,
+                                       recount=self.archive.limit is not None)
 
     def remove_dominated(self):
-        nds = reduce(Evo._reduce_nds, self.pop.keys(), self.pop.keys())
-        self.pop = {k: self.pop[k] for k in nds}
+        """ Rebuild the pareto archive from the population, discarding dominated solutions
+            (only needed if self.pop was modified directly - add_solution keeps it non-dominated) """
+        self.archive.clear()
+        for digest, eval in self.evals.items():
+            self.archive.add(digest, [score for _, score in eval])
+
+        keep = set(self.archive.keys)
+        self.pop = {k: v for k, v in self.pop.items() if k in keep}
+        self.evals = {k: v for k, v in self.evals.items() if k in keep}
+        self.partials = {k: v for k, v in self.partials.items() if k in keep}
+        self.views = OrderedDict((k, v) for k, v in self.views.items() if k in keep)
 
     def __str__(self):
         """ Output the solutions in the population """
         rslt = ""
-        for eval, sol in self.pop.items():
+        for eval, sol in self.items():
             rslt += str(dict(eval)) + ":\t" + str(sol) + "\n" + str(sum(dict(eval).values()))
         return rslt
@@ -0,0 +1,153 @@
+""" master/worker fitness evaluation over shared memory for the evo framework """
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+import numpy as np
+
+# state of each worker process, filled in by _init_worker
+_worker = {}
+
+
+def _init_worker(shm_name, shape, dtype, fitness, crits):
+    """ Attach a worker process to the shared solution buffer """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker['shm'] = shm  # keep the block open for the life of the worker
+    _worker['buf'] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _worker['fitness'] = fitness
+    _worker['crits'] = crits
+
+
+def _score(slot):
+    """ Score the solution held in one slot of the shared buffer """
+    sol = _worker['buf'][slot]
+    crits = _worker['crits']
+    return slot, tuple([(name, f(sol, crit=crits[name])) for name, f in _worker['fitness'].items()])
+
+
+def read_solution(path, shape=None):
+    """ Fast reader for a headerless 0/1 solution csv (one row per ta, one column per section)
+        If every line is exactly "d,d,...,d" (single 0/1 digits) the digits are picked straight
+        out of the file's bytes; files with any other layout fall back to np.loadtxt
+        shape - expected (tas, sections) of the solution (inferred from the file if None) """
+    with open(path, 'rb') as f:
+        raw = np.frombuffer(f.read(), dtype=np.uint8)
+
+    # drop carriage returns and a final line break, then infer the layout from the first line
+    raw = raw[raw != ord('\r')]
+    if len(raw) and raw[-1] == ord('\n'):
+        raw = raw[:-1]
+    breaks = np.flatnonzero(raw == ord('\n'))
+    width = ((breaks[0] if len(breaks) else len(raw)) + 1) // 2
+    rows = (len(raw) + 1) // (2 * width) if width else 0
+
+    # every line must be digit, comma, digit, ..., digit: digits at even positions of a line,
+    # commas at odd ones and a line break after every width digits
+    if width and len(raw) == 2 * width * rows - 1 and (shape is None or (rows, width) == tuple(shape)):
+        pos = np.arange(len(raw)) % (2 * width)
+        digits = pos % 2 == 0
+        expected = np.where(pos == 2 * width - 1, ord('\n'), ord(','))
+        if (np.isin(raw[digits], list(b'01')).all() and (raw[~digits] == expected[~digits]).all()):
+            return (raw[digits] - ord('0')).astype(np.int64).reshape(rows, width)
+
+    L = np.loadtxt(path, delimiter=',', dtype=np.int64, ndmin=2)
+    assert shape is None or L.shape == tuple(shape), f'{path} is {L.shape}, expected {tuple(shape)}'
+    return L
+
+
+def _init_scorer(fitness, crits, shape):
+    """ Set up a worker process that reads and scores solution files """
+    _worker['fitness'] = fitness
+    _worker['crits'] = crits
+    _worker['shape'] = shape
+
+
+def _score_file(path):
+    """ Read and score one solution file
+        A file that cannot be read or scored gets NaN scores and the error, instead of stopping the run
+        Returns: (path, tuple of criteria scores, error message or None) """
+    crits = _worker['crits']
+    try:
+        L = read_solution(path, _worker['shape'])
+        return path, tuple([f(L, crit=crits[name]) for name, f in _worker['fitness'].items()]), None
+
+    except (OSError, ValueError, AssertionError) as e:
+        return path, tuple([np.nan] * len(_worker['fitness'])), f'{type(e).__name__}: {e}'.strip()
+
+
+def score_files(paths, fitness, crits, shape=None, workers=4, chunksize=64):
+    """ Score many solution files, in parallel worker processes when workers > 0
+        Files are read inside the workers, so only paths and scores are pickled, and
+        results come back in the order of paths
+        Returns: generator of (path, tuple of criteria scores, error message or None) """
+    if not workers:
+        _init_scorer(fitness, crits, shape)
+        yield from map(_score_file, paths)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_scorer, initargs=(fitness, crits, shape)) as executor:
+        yield from executor.map(_score_file, paths, chunksize=chunksize)
+
+
+class FitnessPool:
+    """ Scores solutions asynchronously in a pool of worker processes
+
+    Candidates are written into slots of a shared memory block, so only slot numbers and
+    scores are pickled between processes. A slot is reused once its score has been collected. """
+
+    def __init__(self, fitness, crits, shape, dtype, workers=4, slots=None):
+        """ fitness - name -> objective function (must be importable by the workers)
+            crits   - name -> criteria passed to each objective
+            shape   - shape of one solution
+            dtype   - dtype of the solutions
+            workers - # of worker processes
+            slots   - # of solutions that can be waiting on a score at once (default 4 per worker) """
+        if slots is None:
+            slots = 4 * workers
+
+        shape = (slots,) + tuple(shape)
+        dtype = np.dtype(dtype)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        self.buf = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        self.free = list(range(slots))
+        self.pending = {}  # future -> tag of the solution being scored
+        self.executor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                            initargs=(self.shm.name, shape, dtype, fitness, crits))
+
+    def _finished(self, futures):
+        """ Copy finished solutions out of their slots and free the slots
+            Returns: list of (solution, eval, tag) """
+        results = []
+        for future in futures:
+            tag = self.pending.pop(future)
+            slot, eval = future.result()
+            results.append((self.buf[slot].copy(), eval, tag))
+            self.free.append(slot)
+        return results
+
+    def submit(self, sol, tag=None):
+        """ Queue a solution to be scored, waiting for a free slot if every slot is busy
+            tag - returned with the score (e.g. the name of the agent that made the solution)
+            Returns: list of (solution, eval, tag) for every score that has finished so far """
+        results = []
+        if not self.free:
+            done, _ = wait(self.pending, return_when=FIRST_COMPLETED)
+            results = self._finished(done)
+
+        slot = self.free.pop()
+        self.buf[slot] = sol
+        self.pending[self.executor.submit(_score, slot)] = tag
+
+        return results + self._finished([f for f in self.pending if f.done()])
+
+    def drain(self):
+        """ Wait for every queued solution to be scored
+            Returns: list of (solution, eval, tag) """
+        done, _ = wait(self.pending)
+        return self._finished(done)
+
+    def close(self):
+        """ Shut down the workers and release the shared memory """
+        self.executor.shutdown()
+        del self.buf
+        self.shm.close()
+        self.shm.unlink()
@@ -4,119 +4,28 @@ DS 3500 Homework 4 Evo TA Schedule
 March 28th, 2023
 """
 
-from evo import Evo
+from evo import Evo, writable
+from ta_criteria import load_criteria, add_criteria, compile_sparse_criteria, add_sparse_criteria, criteria_bounds
+from convergence import Convergence
+from sparse_schedule import SparseSchedule
+from islands import evolve_islands
+from schedulers import BanditScheduler
+from seeding import seed_population
+from functools import partial
 import pandas as pd
 import numpy as np
 import random as rnd
 
 
-def overallocation(L, crit):
-    """ Criteria: calculate and return summed overallocation penalty of tas
-        Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
-                    crit (int) --> max number of ta's to be assigned to one section
-        Returns: overallocation_penalty (int) --> total overallocation penalty score for solution """
-
-    # build a list of overallocation penalties for each section
-    overallocation_penalty = []
-    # iterate over each section (rows)
-    for row in range(L.shape[0]):
-        if sum(L[row]) > crit[row]:
-            # subtract the max number of ta's from the total ta's assigned
-            penalty = sum(L[row]) - crit[row]
-            overallocation_penalty.append(penalty)
-
-    # sum the penalties of each row for a total overallocation score for the entire solution
-    return sum(overallocation_penalty)
-
-
-def conflict(L, crit):
-    """ Criteria: calculate and return summed time conflicts for each ta
-        Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
-                    crit (str) --> date and time of section
-        Returns: conflict_penalty (int) --> total conflict error score for solution """
-
-    # default conflict score is 0
-    conflict_penalty = 0
-    # iterate over ta (rows )
-    for ta in range(L.shape[0]):
-        # build a list of assigned sections (indices) for the ta
-        s = []
-        for section in range(L.shape[1]):
-            if L[ta, section] == 1:
-                s.append(section)
-
-        # calculate if any section day/times are repeated (conflict)
-        assigned = crit.iloc[s]
-        if len(assigned) > len(set(assigned)):
-            conflict_penalty += 1
-
-    return conflict_penalty
-
-
-def undersupport(L, crit):
-    """ Criteria: calculate and return summed time conflicts for each ta
-        Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
-                    crit (int) --> minimum number of ta's to be assigned to a section
-        Returns: under_penalty (int) --> total under-support penalty score for solution """
-
-    # default under-support penalty score is 0
-    under_penalty = 0
-    # iterate over each section (columns)
-    for section in range(L.shape[1]):
-        # count the amount of ta's assigned for each section
-        ta_count = sum(L[:, section])
-        # if amount of ta's is less than minimum required, add difference to penalty score
-        if ta_count < crit[section]:
-            under_penalty += (crit[section] - ta_count)
-
-    return under_penalty
-
-
-def unwilling(L, crit):
-    """ Criteria: calculate and return summed time conflicts for each ta
-        Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
-                    crit (array) --> array of ta preferences (U='Unwilling')
-        Returns: unwilling_penalty (int) --> total unwilling penalty score for solution """
-
-    # default unwilling penalty score is 0
-    unwilling_penalty = 0
-    # iterate over each ta (rows)
-    for ta in range(L.shape[0]):
-        # iterate over each section (columns)
-        for section in range(L.shape[1]):
-            # if a ta is assigned to a section that the ta marked as unwilling, add penalty
-            if (L[ta, section] == 1) and (crit.iloc[ta, section] == 'U'):
-                unwilling_penalty += 1
-
-    return unwilling_penalty
-
-
-def unpreferred(L, crit):
-    """ Criteria: calculate and return summed time conflicts for each ta
-            Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
-                        crit (array) --> array of ta preferences (W='Willing', P='Preferred')
-            Returns: unpreferred_penalty (int) --> total unwilling penalty score for solution """
-
-    # default unpreferred penalty score is 0
-    unpreferred_penalty = 0
-    # iterate over each ta (rows)
-    for ta in range(L.shape[0]):
-        # iterate over each section (columns)
-        for section in range(L.shape[1]):
-            # if a ta is assigned to a section and they put 'Willing' but not 'Preferred', add penalty
-            if (L[ta, section] == 1) and (crit.iloc[ta, section] == 'W'):
-                unpreferred_penalty += 1
-
-    return unpreferred_penalty
-
-
 def swapper(solutions):
-    """ Agent: swap two random values """
-    L = solutions[-1]
+    """ Agent: swap two random values
+        Returns the new solution with the rows and columns it changed (delta agent) """
+    L = writable(solutions[-1])
     i = rnd.randrange(0, len(L))
     j = rnd.randrange(0, len(L))
-    L[i], L[j] = L[j], L[i]
-    return L
+    cols = np.flatnonzero(L[i] != L[j])
+    L[[i, j]] = L[[j, i]]
+    return L, [i, j], cols
 
 
 def flip(solutions):
@@ -127,47 +36,171 @@ def flip(solutions):
 
 
 def reduce(solutions):
-    """ Agent: reduce amount of assignments """
-    L = solutions[rnd.randrange(0, len(solutions))]
+    """ Agent: reduce amount of assignments
+        Returns the new solution with the rows and columns it changed (delta agent) """
+    L = writable(solutions[rnd.randrange(0, len(solutions))])
 
+    rows, cols = set(), set()
     for i in range(0, rnd.randint(0, len(L))):
         r = rnd.randrange(0, L.shape[0])
         c = rnd.randrange(0, L.shape[1])
         L[r, c] = 0
+        rows.add(r)
+        cols.add(c)
 
-    return L
+    return L, sorted(rows), sorted(cols)
 
 
-def main():
+def build(seeds=0):
+    """ Builds the evo framework with its criteria, agents and starting solution
+        seeds - # of min-cost flow solutions to start from as well (0 for none) """
 
     # initialize evo framework
     E = Evo()
 
-    # read ta and sections files as dataframes
-    ta_df = pd.read_csv('tas.csv')
-    sections_df = pd.read_csv('sections.csv')
-    sections_df = sections_df[['section', 'daytime', 'min_ta']]
+    # compile ta and sections files into criteria arrays
+    crits = load_criteria('tas.csv', 'sections.csv')
 
     # start with a base solution
     L = np.array(pd.read_csv('test1.csv', header=None))
 
     # add fitness criteria to framework
-    E.add_fitness_criteria("overallocation", overallocation, c=ta_df['max_assigned'])
-    E.add_fitness_criteria("conflict", conflict, c=sections_df['daytime'])
-    E.add_fitness_criteria("undersupport", undersupport, c=sections_df['min_ta'])
-    E.add_fitness_criteria("unwilling", unwilling, c=ta_df.iloc[:, -17:])
-    E.add_fitness_criteria("unpreferred", unpreferred, c=ta_df.iloc[:, -17:])
+    add_criteria(E, crits)
+
+    # measure the front's hypervolume against the worst possible scores
+    E.convergence = Convergence(ref=criteria_bounds(crits))
 
     # add agents to framework
-    E.add_agent("swapper", swapper)
+    E.add_agent("swapper", swapper, delta=True)
     E.add_agent("flip", flip)
-    E.add_agent("reduce", reduce)
+    E.add_agent("reduce", reduce, delta=True)
+    E.add_agent("batch_swapper", batch_swapper, batch=True)
+    E.add_agent("batch_flip", batch_flip, batch=True)
+    E.add_agent("batch_reassign", batch_reassign, batch=True)
+
+    # run the agents whose offspring survive most often per cpu second
+    E.set_scheduler(BanditScheduler())
 
     # add solutions to framework
     E.add_solution(L)
+    if seeds:
+        seed_population(E, pd.read_csv('tas.csv'), pd.read_csv('sections.csv'), k=seeds)
+
+    return E
+
+
+def _rng():
+    """ numpy generator seeded from the random module, so rnd.seed makes batch agents repeatable """
+    return np.random.default_rng(rnd.getrandbits(64))
+
+
+def batch_swapper(solutions, n=32):
+    """ Batch agent: n copies of a solution, each with two random rows (tas) swapped """
+    L = solutions[0]
+    rng = _rng()
+    i = rng.integers(0, L.shape[0], n)
+    j = rng.integers(0, L.shape[0], n)
+
+    mutants = np.repeat(L[np.newaxis], n, axis=0)
+    mutants[np.arange(n), i] = L[j]
+    mutants[np.arange(n), j] = L[i]
+    return mutants
+
+
+def batch_flip(solutions, n=32, k=3):
+    """ Batch agent: n copies of a solution, each with k random assignments flipped (0 <-> 1) """
+    L = solutions[0]
+    rng = _rng()
+    rows = rng.integers(0, L.shape[0], (n, k))
+    cols = rng.integers(0, L.shape[1], (n, k))
 
-    # run the evolver
-    E.evolve(100000000, 100, 100, time_limit=600, name='dslayp')
+    mutants = np.repeat(L[np.newaxis], n, axis=0)
+    mutants[np.arange(n)[:, np.newaxis], rows, cols] ^= 1
+    return mutants
+
+
+def batch_reassign(solutions, n=32):
+    """ Batch agent: n copies of a solution, each moving one section's assignment from one ta
+        to an unassigned ta (the number of tas in every section stays the same) """
+    L = solutions[0]
+    rng = _rng()
+    cols = rng.integers(0, L.shape[1], n)
+    assigned = L[:, cols].T == 1  # (n, tas): who is assigned to each mutant's section
+
+    # a random assigned ta and a random unassigned ta for each mutant
+    noise = rng.random(assigned.shape)
+    src = np.where(assigned, noise, -1).argmax(axis=1)
+    dst = np.where(assigned, -1, noise).argmax(axis=1)
+    movable = assigned.any(axis=1) & ~assigned.all(axis=1)
+
+    mutants = np.repeat(L[np.newaxis], n, axis=0)
+    idx = np.flatnonzero(movable)
+    mutants[idx, src[movable], cols[movable]] = 0
+    mutants[idx, dst[movable], cols[movable]] = 1
+    return mutants
+
+
+def sparse_swapper(solutions):
+    """ Sparse agent: swap the sections of two random tas """
+    S = solutions[0]
+    i = rnd.randrange(0, S.shape[0])
+    j = rnd.randrange(0, S.shape[0])
+    return S.replace_rows({i: S.row(j), j: S.row(i)})
+
+
+def sparse_reduce(solutions):
+    """ Sparse agent: remove a few random assignments """
+    S = solutions[0]
+    if S.nnz == 0:
+        return S
+    return S.drop([rnd.randrange(0, S.nnz) for _ in range(rnd.randint(1, 3))])
+
+
+def sparse_reassign(solutions):
+    """ Sparse agent: move one random assignment to a ta not yet in that section """
+    S = solutions[0]
+    if S.nnz == 0:
+        return S
+
+    # the assignment to move and the ta it comes from
+    pos = rnd.randrange(0, S.nnz)
+    section = S.indices[pos]
+    src = int(np.searchsorted(S.indptr, pos, side='right')) - 1
+    dst = rnd.randrange(0, S.shape[0])
+    if section in S.row(dst):
+        return S
+
+    return S.replace_rows({src: S.row(src)[S.row(src) != section],
+                           dst: np.append(S.row(dst), section)})
+
+
+def build_sparse(tas='tas.csv', sections='sections.csv', start='test1.csv'):
+    """ Builds the evo framework on sparse (per-ta section list) solutions """
+    E = Evo()
+    crits = compile_sparse_criteria(pd.read_csv(tas), pd.read_csv(sections))
+    add_sparse_criteria(E, crits)
+    E.convergence = Convergence(ref=criteria_bounds(crits))
+
+    E.add_agent("sparse_swapper", sparse_swapper)
+    E.add_agent("sparse_reduce", sparse_reduce)
+    E.add_agent("sparse_reassign", sparse_reassign)
+    E.set_scheduler(BanditScheduler())
+
+    E.add_solution(SparseSchedule.from_dense(pd.read_csv(start, header=None)))
+    return E
+
+
+def main(islands=None, seeds=0):
+    """ Runs the evolver for 10 minutes, on one core or as parallel islands
+        seeds - # of min-cost flow starting solutions (0 starts from test1.csv only) """
+    if islands:
+        # each island evolves on its own core, trading solutions every 1000 iterations
+        evolve_islands(partial(build, seeds=seeds), islands=islands, epoch=1000, time_limit=600, name='dslayp')
+
+    else:
+        # run the evolver
+        E = build(seeds)
+        E.evolve(100000000, 100, 100, time_limit=600, name='dslayp')
 
 
 if __name__ == '__main__':
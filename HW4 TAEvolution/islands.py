@@ -0,0 +1,112 @@
+""" island-model parallel evolution for the evo framework """
+
+import multiprocessing as mp
+import random as rnd
+import time
+import numpy as np
+
+
+def _front(E, k=None):
+    """ (eval, stored solution) pairs of an island's population, or a random sample of k of them
+        (stored solutions are sent as they are, bit-packed if the framework packs them) """
+    digests = list(E.pop)
+    if k is not None:
+        digests = rnd.sample(digests, min(k, len(digests)))
+    return [(E.evals[d], E.pop[d]) for d in digests]
+
+
+def _insert_stored(E, front):
+    """ Add (eval, stored solution) pairs sent by an island to a framework """
+    for eval, stored in front:
+        E._insert(eval, None, stored=stored, digest=E._digest(stored))
+
+
+def _island(build, seed, conn, epoch, migrants):
+    """ Worker process: builds its own evo framework, then repeatedly takes in migrants,
+        evolves for one epoch and sends back its population size and a sample of migrants.
+        When told to stop (None) it sends its solution shape and whole non-dominated population """
+    rnd.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    E = build()
+
+    while True:
+        incoming = conn.recv()
+        if incoming is None:
+            conn.send((E.shape, _front(E)))
+            break
+
+        _insert_stored(E, incoming)
+        E.evolve(epoch, status=0, time_limit=float('inf'))
+        conn.send((E.size(), _front(E, migrants)))
+
+    conn.close()
+
+
+def evolve_islands(build, islands=4, epoch=1000, migrants=5, n=None, time_limit=600, seed=None,
+                   name=None):
+    """ Runs independent evo frameworks (islands) in parallel processes with periodic migration
+        build      - function with no arguments returning an Evo with its criteria, agents and
+                     starting solutions registered (must be importable by the worker processes)
+        islands    - # of islands (processes)
+        epoch      - # of agent invocations each island runs between migrations
+        migrants   - # of non-dominated solutions each island sends to the next island (ring)
+        n          - max # of epochs (None = run until the time limit)
+        time_limit - # of seconds to run for
+        seed       - base random seed, island i is seeded with seed + i
+        Returns: an Evo holding the merged non-dominated solutions of every island """
+    if seed is None:
+        seed = rnd.randrange(2 ** 32)
+
+    # start one process per island, each with its own pipe
+    ctx = mp.get_context()
+    conns, procs = [], []
+    for i in range(islands):
+        parent, child = ctx.Pipe()
+        p = ctx.Process(target=_island, args=(build, seed + i, child, epoch, migrants), daemon=True)
+        p.start()
+        conns.append(parent)
+        procs.append(p)
+
+    start = time.time()
+    samples = [[] for _ in range(islands)]  # migrants sent by each island in the last epoch
+    fronts = []
+    epochs = 0
+
+    try:
+        while (n is None or epochs < n) and time.time() - start < time_limit:
+            # each island receives the migrants of the previous island
+            for i, conn in enumerate(conns):
+                conn.send(samples[i - 1])
+
+            sizes, samples = zip(*[conn.recv() for conn in conns])
+            epochs += 1
+            print("Epoch: ", epochs)
+            print("Island Sizes: ", list(sizes), "\n")
+
+        # collect the whole front of every island once, at the end
+        for conn in conns:
+            conn.send(None)
+        fronts = [conn.recv() for conn in conns]
+
+    finally:
+        # stop any island still running (an island that crashed can no longer be reached,
+        # so errors here are ignored and the original error is raised)
+        for conn, p in zip(conns, procs):
+            try:
+                if p.is_alive() and not fronts:
+                    conn.send(None)
+            except (BrokenPipeError, EOFError, OSError):
+                pass
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+
+    # merge the fronts of every island into a single non-dominated population
+    E = build()
+    for shape, front in fronts:
+        if E.shape is None:
+            E.shape = shape
+        _insert_stored(E, front)
+
+    E.report(time.time() - start, name=name)
+    return E
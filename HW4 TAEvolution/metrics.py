@@ -0,0 +1,76 @@
+""" run metrics for the evo framework """
+
+import time
+import pandas as pd
+
+
+class EvoMetrics:
+    """ Counters and timers collected while an Evo framework evolves
+
+    Per agent: invocations, wall time, offspring produced and offspring accepted into the
+    non-dominated population. Run-wide: time spent in agents, fitness evaluation and
+    dominance filtering, and the number of fitness evaluations. """
+
+    def __init__(self):
+        self.agents = {}  # name -> {'calls', 'seconds', 'offspring', 'accepted'}
+        self.agent_seconds = 0.0
+        self.fitness_seconds = 0.0
+        self.dominance_seconds = 0.0
+        self.evaluations = 0  # solutions scored by the criteria (cache hits and duplicates excluded)
+        self.start = time.perf_counter()
+
+    def _agent(self, name):
+        return self.agents.setdefault(name, {'calls': 0, 'seconds': 0.0, 'offspring': 0, 'accepted': 0})
+
+    def agent_call(self, name, seconds):
+        """ Record one invocation of an agent and how long it took """
+        stats = self._agent(name)
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+        self.agent_seconds += seconds
+
+    def offspring(self, name, accepted):
+        """ Record whether an offspring of an agent joined the population """
+        stats = self._agent(name)
+        stats['offspring'] += 1
+        stats['accepted'] += int(accepted)
+
+    def fitness(self, seconds, evaluations=1):
+        """ Record time spent scoring solutions """
+        self.fitness_seconds += seconds
+        self.evaluations += evaluations
+
+    def dominance(self, seconds):
+        """ Record time spent in the pareto archive """
+        self.dominance_seconds += seconds
+
+    def summary(self):
+        """ Run-wide metrics as a dictionary """
+        runtime = time.perf_counter() - self.start
+        return {'runtime': runtime,
+                'agent seconds': self.agent_seconds,
+                'fitness seconds': self.fitness_seconds,
+                'dominance seconds': self.dominance_seconds,
+                'other seconds': runtime - self.agent_seconds - self.fitness_seconds - self.dominance_seconds,
+                'evaluations': self.evaluations,
+                'evaluations/sec': self.evaluations / runtime if runtime > 0 else 0.0}
+
+    def to_frame(self):
+        """ Per-agent metrics as a dataframe (one row per agent) """
+        df = pd.DataFrame.from_dict(self.agents, orient='index',
+                                    columns=['calls', 'seconds', 'offspring', 'accepted'])
+        df.index.name = 'agent'
+        df['seconds/call'] = df['seconds'] / df['calls'].clip(lower=1)
+        df['acceptance'] = df['accepted'] / df['offspring'].clip(lower=1)
+        return df
+
+    def to_csv(self, path):
+        """ Export the per-agent metrics with the run-wide metrics appended as extra columns """
+        df = self.to_frame()
+        for key, value in self.summary().items():
+            df[key] = value
+        df.to_csv(path)
+
+    def reset(self):
+        """ Clear every counter and restart the clock """
+        self.__init__()
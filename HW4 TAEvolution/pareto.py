@@ -0,0 +1,105 @@
+""" incremental pareto archive for the evo framework """
+
+import numpy as np
+
+
+class ParetoArchive:
+    """ The non-dominated set of a population (lower scores are better on every criteria)
+
+    Score vectors are kept in a numpy matrix sorted by their total. A solution can only be
+    dominated by one with a smaller total and can only dominate ones with a larger total,
+    so each new solution is compared (vectorized) against just one side of its position.
+
+    If a limit is set, the most crowded solutions (smallest crowding distance) are evicted
+    whenever the archive grows past it, so the front stays spread out at a fixed size. """
+
+    def __init__(self, limit=None):
+        """ limit - max # of solutions kept (None = unbounded) """
+        self.limit = limit
+        self.crowded = 0  # solutions evicted for crowding (not dominance)
+        self.keys = []  # population keys, in the same order as the rows of scores
+        self.scores = None  # (n, criteria) matrix of scores
+        self.totals = None  # sum of each row of scores (ascending)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, score):
+        """ Offer a new solution to the archive
+            key   - the population key of the solution
+            score - its vector of criteria scores
+            Returns: (accepted, evicted) where evicted lists the keys of the solutions it dominates
+            (solutions with exactly the same scores do not dominate each other, both are kept) """
+        score = np.asarray(score, dtype=float)
+        total = score.sum()
+
+        if self.scores is None:
+            self.keys = [key]
+            self.scores = score[np.newaxis, :]
+            self.totals = np.array([total])
+            return True, []
+
+        lo = np.searchsorted(self.totals, total, side='left')
+        hi = np.searchsorted(self.totals, total, side='right')
+
+        # rejected if anything with a smaller total is at least as good everywhere
+        if np.any(np.all(self.scores[:lo] <= score, axis=1)):
+            return False, []
+
+        # evict everything with a larger total that the new solution is at least as good as
+        worse = hi + np.flatnonzero(np.all(self.scores[hi:] >= score, axis=1))
+        evicted = [self.keys[i] for i in worse]
+        if len(worse) > 0:
+            keep = np.ones(len(self.keys), dtype=bool)
+            keep[worse] = False
+            self.keys = [k for k, kept in zip(self.keys, keep) if kept]
+            self.scores = self.scores[keep]
+            self.totals = self.totals[keep]
+
+        # insert at its sorted position (every evicted row came after hi, so hi is still valid)
+        self.keys.insert(hi, key)
+        self.scores = np.insert(self.scores, hi, score, axis=0)
+        self.totals = np.insert(self.totals, hi, total)
+
+        # over the limit: drop the most crowded solution (possibly the new one)
+        if self.limit is not None and len(self.keys) > self.limit:
+            i = self._most_crowded()
+            self.crowded += 1
+            if self.keys[i] == key:
+                self._remove(i)
+                return False, evicted
+            evicted.append(self.keys[i])
+            self._remove(i)
+
+        return True, evicted
+
+    def crowding(self):
+        """ Crowding distance of each solution: the normalized size of the box between its
+            neighbours on every criteria (infinite for the best and worst on any criteria) """
+        n, m = self.scores.shape
+        distance = np.zeros(n)
+        order = np.argsort(self.scores, axis=0, kind='stable')
+        ranked = np.take_along_axis(self.scores, order, axis=0)
+        span = ranked[-1] - ranked[0]
+        span[span == 0] = 1.0
+
+        # gap between each solution's neighbours, per criteria
+        gaps = np.full((n, m), np.inf)
+        gaps[1:-1] = (ranked[2:] - ranked[:-2]) / span
+        np.add.at(distance, order, gaps)
+        return distance
+
+    def _most_crowded(self):
+        """ Row of the solution with the smallest crowding distance (ties: the largest total) """
+        distance = self.crowding()
+        return len(distance) - 1 - int(np.argmin(distance[::-1]))
+
+    def _remove(self, i):
+        """ Remove row i of the archive """
+        del self.keys[i]
+        self.scores = np.delete(self.scores, i, axis=0)
+        self.totals = np.delete(self.totals, i)
+
+    def clear(self):
+        """ Remove every solution from the archive """
+        self.keys, self.scores, self.totals = [], None, None
@@ -0,0 +1,58 @@
+""" agent schedulers for the evo framework: which agent to run next """
+
+import math
+import random as rnd
+
+
+class UniformScheduler:
+    """ Picks every agent with equal probability """
+
+    def pick(self, names, metrics):
+        """ Choose the next agent to run
+            names   - list of agent names
+            metrics - the framework's EvoMetrics (unused) """
+        return rnd.choice(names)
+
+
+class BanditScheduler:
+    """ Multi-armed bandit (UCB1) that favours agents whose offspring enter the
+    non-dominated population most often per second of CPU they cost
+
+    An agent's cost per offspring is its own run time per offspring plus the average time
+    the framework spends scoring and filtering one offspring, so cheap agents are not
+    over-rewarded for skipping work the framework still has to do (and batch agents are
+    compared per offspring, not per call). """
+
+    def __init__(self, warmup=20, explore=1.0):
+        """ warmup  - # of offspring each agent makes before the bandit starts choosing
+            explore - weight of the UCB exploration bonus """
+        self.warmup = warmup
+        self.explore = explore
+
+    def pick(self, names, metrics):
+        """ Choose the agent with the best upper confidence bound on payoff per CPU-second
+            names   - list of agent names
+            metrics - the framework's EvoMetrics (per-agent calls, time and accepted offspring) """
+        stats = [metrics.agents.get(name) for name in names]
+
+        # try every agent a few times before trusting the estimates
+        cold = [name for name, stat in zip(names, stats) if stat is None or stat['offspring'] < self.warmup]
+        if cold:
+            return rnd.choice(cold)
+
+        # framework time per offspring (fitness + dominance), shared by every agent
+        offspring = sum(stat['offspring'] for stat in stats)
+        overhead = (metrics.fitness_seconds + metrics.dominance_seconds) / offspring
+
+        costs = [stat['seconds'] / stat['offspring'] + overhead for stat in stats]
+        mean_cost = sum(costs) / len(costs)
+
+        best, best_bound = None, -1.0
+        for name, stat, cost in zip(names, stats, costs):
+            payoff = stat['accepted'] / stat['offspring']
+            bonus = self.explore * math.sqrt(2 * math.log(offspring) / stat['offspring'])
+            bound = (payoff + bonus) * mean_cost / cost
+            if bound > best_bound:
+                best, best_bound = name, bound
+
+        return best
@@ -0,0 +1,77 @@
+"""
+Avril Mauro & Katelyn Donn
+DS 3500 Homework 4 -- Constructive Seeding of TA Schedules (min-cost flow)
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import linprog
+
+
+def flow_solutions(ta_df, sections_df, k=5, seed=0, noise=0.1):
+    """ Builds k starting solutions by solving ta assignment as a min-cost flow
+        source --> ta (capacity max_assigned) --> ta timeslot (capacity 1, so no conflicts)
+        --> section (cost 0 if preferred, 1 if willing, no arc if unwilling) --> sink
+        (min_ta units rewarded, up to max_ta allowed)
+        The network matrix is totally unimodular, so the simplex solution of the LP is integral.
+        Each solution prices an unfilled min_ta slot differently against an unpreferred
+        assignment (from 2x down to 1/4) and adds a little random noise to the costs,
+        so the seeds trade under-support against unpreferred assignments.
+        Parameters: ta_df (dataframe) --> tas.csv
+                    sections_df (dataframe) --> sections.csv
+                    k (int) --> number of solutions
+                    seed (int) --> random seed for the cost noise
+        Returns: list of k (tas, sections) 0/1 matrices """
+    rng = np.random.default_rng(seed)
+    n_tas, n_sections = len(ta_df), len(sections_df)
+
+    # one arc (variable) per ta/section pair the ta is willing to take
+    prefs = ta_df.iloc[:, -n_sections:].to_numpy()
+    tas, sections = np.nonzero(prefs != 'U')
+    unpreferred = (prefs[tas, sections] == 'W').astype(float)
+    n_arcs = len(tas)
+    arcs = np.arange(n_arcs)
+
+    # then one shortfall variable per section (units of min_ta left unfilled)
+    n_vars = n_arcs + n_sections
+    ones = np.ones(n_arcs)
+
+    # capacities: tas' max_assigned, one section per ta timeslot, sections' max_ta
+    slots, _ = pd.factorize(sections_df['daytime'])
+    _, ta_slot = np.unique(tas * (slots.max() + 1) + slots[sections], return_inverse=True)
+    by_ta = sparse.csr_matrix((ones, (tas, arcs)), shape=(n_tas, n_vars))
+    by_slot = sparse.csr_matrix((ones, (ta_slot, arcs)), shape=(ta_slot.max() + 1 if n_arcs else 0, n_vars))
+    by_section = sparse.csr_matrix((ones, (sections, arcs)), shape=(n_sections, n_vars))
+    shortfall = sparse.hstack([sparse.csr_matrix((n_sections, n_arcs)), sparse.identity(n_sections)])
+
+    # (min_ta is written as -(assigned + shortfall) <= -min_ta)
+    min_ta = sections_df['min_ta'].to_numpy(dtype=float)
+    A = sparse.vstack([by_ta, by_slot, by_section, -(by_section + shortfall)]).tocsr()
+    b = np.concatenate([ta_df['max_assigned'].to_numpy(dtype=float),
+                        np.ones(by_slot.shape[0]),
+                        sections_df['max_ta'].to_numpy(dtype=float),
+                        -min_ta])
+    bounds = np.column_stack([np.zeros(n_vars), np.concatenate([np.ones(n_arcs), min_ta])])
+
+    solutions = []
+    for penalty in np.linspace(2, 0.25, k):
+        # an unfilled min_ta slot costs penalty and an unpreferred assignment 1, so early seeds fill
+        # every section first and later ones leave a section short rather than assign a willing (W) ta
+        cost = np.concatenate([unpreferred + noise * rng.random(n_arcs),
+                               np.full(n_sections, penalty)])
+        res = linprog(cost, A_ub=A, b_ub=b, bounds=bounds, method='highs-ds')
+
+        L = np.zeros((n_tas, n_sections), dtype=np.int64)
+        if res.x is not None:
+            chosen = res.x[:n_arcs] > 0.5
+            L[tas[chosen], sections[chosen]] = 1
+        solutions.append(L)
+
+    return solutions
+
+
+def seed_population(E, ta_df, sections_df, k=5, seed=0):
+    """ Adds k min-cost flow solutions to an evo framework
+        Returns: number of seeds that joined the population """
+    return sum(bool(E.add_solution(L)) for L in flow_solutions(ta_df, sections_df, k, seed))
@@ -0,0 +1,93 @@
+""" sparse (CSR) 0/1 solutions for the evo framework """
+
+import hashlib
+import numpy as np
+
+
+class SparseSchedule:
+    """ A 0/1 assignment matrix stored as compressed sparse rows
+
+    Row i (a ta) is assigned to the columns (sections) indices[indptr[i]:indptr[i + 1]].
+    Memory and scoring cost scale with the number of assignments, not rows x columns.
+    Schedules are never modified in place - agents build new ones (see replace_rows, drop). """
+
+    def __init__(self, indptr, indices, shape):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.shape = tuple(int(n) for n in shape)
+        self.indptr.flags.writeable = False
+        self.indices.flags.writeable = False
+
+    @classmethod
+    def from_dense(cls, L):
+        """ Sparse schedule of a dense 0/1 matrix """
+        L = np.asarray(L)
+        rows, cols = np.nonzero(L)
+        counts = np.bincount(rows, minlength=L.shape[0])
+        return cls(np.concatenate([[0], np.cumsum(counts)]), cols, L.shape)
+
+    @classmethod
+    def from_lists(cls, lists, cols):
+        """ Sparse schedule from a list of assigned columns for each row """
+        counts = [len(row) for row in lists]
+        indices = np.concatenate([np.sort(row) for row in lists]) if lists else []
+        return cls(np.concatenate([[0], np.cumsum(counts)]), indices, (len(lists), cols))
+
+    def to_dense(self, dtype=np.int64):
+        """ The schedule as a dense (rows, cols) matrix """
+        L = np.zeros(self.shape, dtype=dtype)
+        L[self.row_ids(), self.indices] = 1
+        return L
+
+    @property
+    def nnz(self):
+        """ Number of assignments """
+        return len(self.indices)
+
+    def row(self, i):
+        """ Columns assigned to row i """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def row_counts(self):
+        """ Number of assignments in each row """
+        return np.diff(self.indptr)
+
+    def row_ids(self):
+        """ Row of each assignment (parallel to indices) """
+        return np.repeat(np.arange(self.shape[0]), self.row_counts())
+
+    def col_counts(self):
+        """ Number of assignments in each column """
+        return np.bincount(self.indices, minlength=self.shape[1])
+
+    def replace_rows(self, rows):
+        """ New schedule with some rows replaced
+            rows - dictionary of row index -> array of assigned columns """
+        counts = self.row_counts().copy()
+        pieces, start = [], 0
+        for i in sorted(rows):
+            pieces.append(self.indices[self.indptr[start]:self.indptr[i]])
+            pieces.append(np.sort(np.asarray(rows[i], dtype=np.int64)))
+            counts[i] = len(rows[i])
+            start = i + 1
+        pieces.append(self.indices[self.indptr[start]:])
+
+        return SparseSchedule(np.concatenate([[0], np.cumsum(counts)]), np.concatenate(pieces), self.shape)
+
+    def drop(self, positions):
+        """ New schedule without the assignments at the given positions of indices """
+        keep = np.ones(self.nnz, dtype=bool)
+        keep[positions] = False
+        counts = np.bincount(self.row_ids()[keep], minlength=self.shape[0])
+        return SparseSchedule(np.concatenate([[0], np.cumsum(counts)]), self.indices[keep], self.shape)
+
+    def digest(self):
+        """ Content digest of the schedule (equal schedules have equal digests) """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(np.array(self.shape, dtype=np.int64).tobytes())
+        h.update(self.indptr.tobytes())
+        h.update(self.indices.tobytes())
+        return h.digest()
+
+    def __repr__(self):
+        return f'SparseSchedule(shape={self.shape}, nnz={self.nnz})'
@@ -0,0 +1,178 @@
+"""
+Avril Mauro & Katelyn Donn
+DS 3500 Homework 4 -- Compiled TA Scheduling Criteria
+"""
+
+import pandas as pd
+import numpy as np
+
+
+def compile_criteria(ta_df, sections_df):
+    """ Converts the ta and section dataframes into numpy arrays (done once per run)
+        Parameters: ta_df (dataframe) --> tas.csv (max_assigned + one preference column per section)
+                    sections_df (dataframe) --> sections.csv (daytime + min_ta)
+        Returns: crits (dict) --> criteria name : compiled criteria array """
+
+    # ta preferences (U/W/P) for each section as boolean masks
+    prefs = ta_df.iloc[:, -len(sections_df):].to_numpy()
+
+    # section x timeslot incidence matrix (1 if the section meets in that timeslot)
+    slots, _ = pd.factorize(sections_df['daytime'])
+    timeslots = np.zeros((len(sections_df), slots.max() + 1), dtype=np.int64)
+    timeslots[np.arange(len(sections_df)), slots] = 1
+
+    return {'overallocation': ta_df['max_assigned'].to_numpy(dtype=np.int64),
+            'conflict': timeslots,
+            'undersupport': sections_df['min_ta'].to_numpy(dtype=np.int64),
+            'unwilling': prefs == 'U',
+            'unpreferred': prefs == 'W'}
+
+
+def load_criteria(tas='tas.csv', sections='sections.csv'):
+    """ Reads the ta and section files and compiles their criteria arrays """
+    return compile_criteria(pd.read_csv(tas), pd.read_csv(sections))
+
+
+def criteria_bounds(crits):
+    """ Worst possible score of each criteria (every ta assigned to every section),
+        e.g. a hypervolume reference point that no solution can fall outside of
+        Parameters: crits (dict) --> compiled criteria (compile_criteria or compile_sparse_criteria)
+        Returns: array of upper bounds, in the order of CRITERIA """
+    tas, sections = crits['unwilling'].shape
+    return np.array([np.clip(sections - crits['overallocation'], 0, None).sum(),
+                     tas,
+                     crits['undersupport'].sum(),
+                     crits['unwilling'].sum(),
+                     crits['unpreferred'].sum()], dtype=float)
+
+
+def overallocation(L, crit):
+    """ Criteria: summed overallocation penalty of tas
+        Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
+                    crit (array) --> max number of sections each ta can be assigned to
+        Returns: total overallocation penalty score for solution """
+    return np.maximum(L.sum(axis=-1, dtype=np.int64) - crit, 0).sum(axis=-1)
+
+
+def conflict(L, crit):
+    """ Criteria: number of tas assigned to two or more sections in the same timeslot
+        Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
+                    crit (array) --> section x timeslot incidence matrix
+        Returns: total conflict error score for solution """
+    return ((L @ crit) > 1).any(axis=-1).sum(axis=-1)
+
+
+def undersupport(L, crit):
+    """ Criteria: summed shortfall of tas below each section's minimum
+        Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
+                    crit (array) --> minimum number of ta's to be assigned to each section
+        Returns: total under-support penalty score for solution """
+    return np.maximum(crit - L.sum(axis=-2, dtype=np.int64), 0).sum(axis=-1)
+
+
+def unwilling(L, crit):
+    """ Criteria: number of assignments a ta marked as unwilling
+        Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
+                    crit (array) --> boolean mask of ta preferences (True = 'U')
+        Returns: total unwilling penalty score for solution """
+    return ((L == 1) & crit).sum(axis=(-2, -1))
+
+
+def unpreferred(L, crit):
+    """ Criteria: number of assignments a ta marked as willing but not preferred
+        Parameters: L (array) --> matrix of solutions (0 = not assigned, 1 = assigned)
+                    crit (array) --> boolean mask of ta preferences (True = 'W')
+        Returns: total unpreferred penalty score for solution """
+    return ((L == 1) & crit).sum(axis=(-2, -1))
+
+
+def overallocation_terms(L, crit, idx=None):
+    """ Per-ta overallocation penalties (for the tas in idx, or every ta) """
+    idx = slice(None) if idx is None else idx
+    return np.maximum(L[idx].sum(axis=-1, dtype=np.int64) - crit[idx], 0)
+
+
+def conflict_terms(L, crit, idx=None):
+    """ Per-ta conflict penalties (1 if the ta has a timeslot conflict) """
+    idx = slice(None) if idx is None else idx
+    return ((L[idx] @ crit) > 1).any(axis=-1).astype(np.int64)
+
+
+def undersupport_terms(L, crit, idx=None):
+    """ Per-section under-support penalties (for the sections in idx, or every section) """
+    idx = slice(None) if idx is None else idx
+    return np.maximum(crit[idx] - L[:, idx].sum(axis=0, dtype=np.int64), 0)
+
+
+def preference_terms(L, crit, idx=None):
+    """ Per-ta count of assignments matching a preference mask (unwilling / unpreferred) """
+    idx = slice(None) if idx is None else idx
+    return ((L[idx] == 1) & crit[idx]).sum(axis=-1)
+
+
+def compile_sparse_criteria(ta_df, sections_df):
+    """ Criteria arrays for sparse (SparseSchedule) solutions: the same as compile_criteria
+        except conflict, which maps each section to its timeslot number """
+    crits = compile_criteria(ta_df, sections_df)
+    crits['conflict'] = crits['conflict'].argmax(axis=1)
+    return crits
+
+
+def sparse_overallocation(S, crit):
+    """ Criteria: overallocation of a SparseSchedule (crit = max sections per ta) """
+    return np.maximum(S.row_counts() - crit, 0).sum()
+
+
+def sparse_conflict(S, crit):
+    """ Criteria: conflicts of a SparseSchedule (crit = timeslot number of each section) """
+    # one key per (ta, timeslot) assignment, a repeated key is a conflict for that ta
+    n_slots = crit.max() + 1
+    keys = np.sort(S.row_ids() * n_slots + crit[S.indices])
+    repeated = keys[1:][keys[1:] == keys[:-1]]
+    return len(np.unique(repeated // n_slots))
+
+
+def sparse_undersupport(S, crit):
+    """ Criteria: under-support of a SparseSchedule (crit = min tas per section) """
+    return np.maximum(crit - S.col_counts(), 0).sum()
+
+
+def sparse_preference(S, crit):
+    """ Criteria: assignments of a SparseSchedule matching a preference mask (unwilling / unpreferred) """
+    return crit[S.row_ids(), S.indices].sum()
+
+
+# criteria in the order they are registered with the evo framework
+CRITERIA = {'overallocation': overallocation,
+            'conflict': conflict,
+            'undersupport': undersupport,
+            'unwilling': unwilling,
+            'unpreferred': unpreferred}
+
+# per-ta (axis 0) or per-section (axis 1) penalties of each criteria, used for delta evaluation
+TERMS = {'overallocation': (overallocation_terms, 0),
+         'conflict': (conflict_terms, 0),
+         'undersupport': (undersupport_terms, 1),
+         'unwilling': (preference_terms, 0),
+         'unpreferred': (preference_terms, 0)}
+
+
+SPARSE_CRITERIA = {'overallocation': sparse_overallocation,
+                   'conflict': sparse_conflict,
+                   'undersupport': sparse_undersupport,
+                   'unwilling': sparse_preference,
+                   'unpreferred': sparse_preference}
+
+
+def add_criteria(E, crits):
+    """ Registers every compiled criteria with an evo framework
+        (each criteria reduces over the last two axes, so all of them can score batches) """
+    for name, f in CRITERIA.items():
+        terms, axis = TERMS[name]
+        E.add_fitness_criteria(name, f, c=crits[name], batch=True, terms=terms, axis=axis)
+
+
+def add_sparse_criteria(E, crits):
+    """ Registers every sparse criteria with an evo framework (crits from compile_sparse_criteria) """
+    for name, f in SPARSE_CRITERIA.items():
+        E.add_fitness_criteria(name, f, c=crits[name])